@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -41,6 +42,13 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
 ]
 
+SQL_INSTRUMENTATION = os.getenv('SQL_INSTRUMENTATION', False)
+
+SQL_DUPLICATE_THRESHOLD = int(os.getenv('SQL_DUPLICATE_THRESHOLD', 3))
+
+if SQL_INSTRUMENTATION:
+    MIDDLEWARE.insert(0, 'utils.middleware.QueryCountMiddleware')
+
 ROOT_URLCONF = 'foodgram_backend.urls'
 
 TEMPLATES = [
@@ -61,6 +69,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
+ASGI_APPLICATION = 'foodgram_backend.asgi.application'
+
+ASYNC_VIEWS = os.getenv('SERVER_MODE') == 'asgi'
+
 if os.getenv('DEVELOPMENT'):
     DATABASES = {
         'default': {
@@ -71,12 +83,22 @@ if os.getenv('DEVELOPMENT'):
 else:
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.postgresql',
+            'ENGINE': (
+                'utils.db_pool' if os.getenv('DB_POOL')
+                else 'django.db.backends.postgresql'
+            ),
             'NAME': os.getenv('POSTGRES_DB', 'django'),
             'USER': os.getenv('POSTGRES_USER', 'django'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
             'HOST': os.getenv('DB_HOST', ''),
-            'PORT': os.getenv('DB_PORT', 5432)
+            'PORT': os.getenv('DB_PORT', 5432),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
+            'CONN_HEALTH_CHECKS': bool(os.getenv('DB_CONN_HEALTH_CHECKS')),
+            'POOL': {
+                'SIZE': int(os.getenv('DB_POOL_SIZE', 4)),
+                'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                'CHECK_IDLE': float(os.getenv('DB_POOL_CHECK_IDLE', 30)),
+            },
         }
     }
 
@@ -111,6 +133,16 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(
+    os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', 1024 * 1024)
+)
+
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', 10 * 1024 * 1024)
+)
+
+RECIPE_IMAGE_MAX_PIXELS = int(os.getenv('RECIPE_IMAGE_MAX_PIXELS', 40_000_000))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
@@ -119,7 +151,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
@@ -147,6 +179,45 @@ DJOSER = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+    }
+}
+
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', 24 * 3600))
+
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 60))
+
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 10000))
+
+AUTH_TOKEN_SHARED_CACHE = bool(os.getenv('AUTH_TOKEN_SHARED_CACHE'))
+
+RECIPE_IDS_CACHE_TIMEOUT = int(os.getenv('RECIPE_IDS_CACHE_TIMEOUT', 3600))
+
+INGREDIENT_AUTOCOMPLETE_LIMIT = int(
+    os.getenv('INGREDIENT_AUTOCOMPLETE_LIMIT', 20)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram': {
+            'handlers': ['console'],
+            'level': os.getenv('FOODGRAM_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
 CORS_URLS_REGEX = r'^/api/.*$'
 
 CORS_ALLOWED_ORIGINS = [
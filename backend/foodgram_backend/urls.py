@@ -3,9 +3,12 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from utils.views import DatabasePoolView
+
 urls = [
     path('', include('recipes.urls')),
     path('', include('users.urls')),
+    path('db-pool/', DatabasePoolView.as_view(), name='db-pool'),
 ]
 
 urlpatterns = [
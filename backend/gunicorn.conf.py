@@ -0,0 +1,10 @@
+import os
+
+bind = '0.0.0.0:8000'
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+
+if os.getenv('SERVER_MODE') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'foodgram_backend.asgi:application'
+else:
+    wsgi_app = 'foodgram_backend.wsgi:application'
@@ -43,15 +43,11 @@ class RecipeAdmin(admin.ModelAdmin):
         'get_image',
         'ingredients_data',
         'tags_data',
-        'favorite_count'
+        'favorites_count'
     )
     list_filter = ('author', 'name', 'tags',)
     inlines = [IngredientInline, TagInline]
 
-    @admin.display(description='Добавлений в избранное')
-    def favorite_count(self, obj):
-        return obj.favorite.count()
-
     @admin.display(description='Ингредиенты')
     def ingredients_data(self, obj):
         return list(obj.ingredients.all())
@@ -0,0 +1,122 @@
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.urls import URLPattern
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from utils.cache import response_cache_key
+from utils.conditional import make_etag, set_validators, timestamp_of
+from .models import DataVersion
+from .views import (RECIPE_DATA_VERSIONS, IngredientViewSet, RecipeViewSet,
+                    TagViewSet)
+
+JSON_ACCEPT = ('', '*/*', 'application/json')
+JSON = 'application/json'
+
+
+def wants_json(request, kwargs):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.GET
+        and 'format' not in kwargs
+        and request.headers.get('Accept', '') in JSON_ACCEPT
+    )
+
+
+def conditional_response(request, etag, timestamp):
+    response = get_conditional_response(
+        request, etag=etag, last_modified=timestamp
+    )
+    return response and set_validators(response, etag, timestamp)
+
+
+async def reference_response(viewset, action, request, pk=''):
+    """Ответ справочника из кэша без обращения к потоку с DRF."""
+    parts, last_modified, version = viewset.validators_for(
+        await DataVersion.objects.filter(name=viewset.data_version).afirst()
+    )
+    etag, timestamp = make_etag(*parts), timestamp_of(last_modified)
+    response = conditional_response(request, etag, timestamp)
+    if response is None:
+        cached = await caches[viewset.cache_alias].aget(response_cache_key(
+            viewset.__name__, action, pk, version, JSON
+        ))
+        if cached is None:
+            return None
+        content, content_type = cached
+        response = set_validators(
+            HttpResponse(content, content_type=content_type), etag, timestamp
+        )
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def recipe_response(request, pk):
+    """304 на условный запрос рецепта от анонимного пользователя."""
+    if 'Authorization' in request.headers or not (
+        'If-None-Match' in request.headers
+        or 'If-Modified-Since' in request.headers
+    ):
+        return None
+    user = AnonymousUser()
+    recipe = await RecipeViewSet.validators_query(user, pk).afirst()
+    if recipe is None:
+        return None
+    parts, last_modified = RecipeViewSet.validators_for(
+        user, pk, recipe,
+        await DataVersion.objects.aget_versions(*RECIPE_DATA_VERSIONS)
+    )
+    return conditional_response(
+        request, make_etag(*parts), timestamp_of(last_modified)
+    )
+
+
+FAST_PATHS = {
+    'tags-list': partial(reference_response, TagViewSet, 'list'),
+    'tags-detail': partial(reference_response, TagViewSet, 'retrieve'),
+    'ingredients-list': partial(
+        reference_response, IngredientViewSet, 'list'
+    ),
+    'ingredients-detail': partial(
+        reference_response, IngredientViewSet, 'retrieve'
+    ),
+    'recipes-detail': recipe_response,
+}
+
+
+def async_view(view, fast_path):
+    """Асинхронная вьюха: быстрый ответ без потока или обычная вьюха DRF.
+
+    Вьюха DRF выполняется в отдельном потоке запроса, поэтому медленный
+    клиент или запрос к БД не занимает весь процесс.
+    """
+    sync_view = sync_to_async(view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if wants_json(request, kwargs):
+            try:
+                response = await fast_path(request, *args, **kwargs)
+            except ValueError:
+                response = None
+            if response is not None:
+                return response
+        return await sync_view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def async_routes(urls):
+    """Заменяет вьюхи чтения из роутера на асинхронные."""
+    return [
+        URLPattern(
+            url.pattern,
+            async_view(url.callback, FAST_PATHS[url.name]),
+            url.default_args,
+            url.name
+        ) if url.name in FAST_PATHS else url
+        for url in urls
+    ]
@@ -0,0 +1,77 @@
+import re
+import threading
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .models import Ingredient
+
+WORD_START = re.compile(r'\b\w')
+
+EXACT, PREFIX, WORD_PREFIX = range(3)
+
+
+def normalize(value):
+    """Приведение к единому регистру, в том числе для кириллицы."""
+    return value.casefold().replace('ё', 'е').strip()
+
+
+class IngredientIndex:
+    """Префиксный индекс ингредиентов в памяти процесса.
+
+    Помнит версию DataVersion, по которой построен, и перестраивается,
+    как только запрос приходит с другой версией. Так ответ всегда
+    соответствует ETag, даже если ингредиенты менял другой процесс.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._version = None
+
+    def build(self, version):
+        rows = list(Ingredient.objects.order_by('name').values(
+            'id', 'name', 'measurement_unit'
+        ))
+        names = [normalize(row['name']) for row in rows]
+        keys = []
+        for position, name in enumerate(names):
+            keys.append((name, PREFIX, position))
+            for match in WORD_START.finditer(name):
+                if match.start():
+                    keys.append((name[match.start():], WORD_PREFIX, position))
+        keys.sort()
+        self._data = (rows, names, keys)
+        self._version = version
+
+    def get_data(self, version):
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self.build(version)
+        return self._data
+
+    def search(self, query, version, limit=None):
+        """Ингредиенты по началу названия или слова в названии.
+
+        Сначала точные совпадения, затем совпадения по началу названия,
+        затем по началу любого слова.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        rows, names, keys = self.get_data(version)
+        ranks = {}
+        for key, kind, position in keys[bisect_left(keys, (query,)):]:
+            if not key.startswith(query):
+                break
+            rank = EXACT if kind == PREFIX and key == query else kind
+            ranks[position] = min(ranks.get(position, rank), rank)
+        found = sorted(ranks, key=lambda position: (
+            ranks[position], len(names[position]), names[position]
+        ))
+        limit = limit or settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        return [rows[position] for position in found[:limit]]
+
+
+ingredient_index = IngredientIndex()
@@ -1,6 +1,29 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+from django.utils.functional import cached_property
 from django_filters import rest_framework as filters
 
-from .models import Ingredient, Recipe
+from .models import (DataVersion, Favorite, Ingredient, Recipe, RecipeTags,
+                     Shoplist, Tag)
+from .search import search_recipes
+
+
+def tag_ids():
+    """Словарь slug → id тегов в кэше под текущей версией тегов.
+
+    Версия читается из БД, поэтому изменения тегов, в том числе
+    массовые из load_data, сразу видны во всех процессах.
+    """
+    version = DataVersion.objects.get_versions(
+        DataVersion.TAGS
+    ).get(DataVersion.TAGS)
+    key = f'tag-ids:{version.version if version else 0}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = dict(Tag.objects.values_list('slug', 'pk'))
+        cache.set(key, ids, settings.RESPONSE_CACHE_TIMEOUT)
+    return ids
 
 
 class RecipeFilter(filters.FilterSet):
@@ -10,8 +33,14 @@ class RecipeFilter(filters.FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
     )
-    tags = filters.AllValuesMultipleFilter(
-        field_name='tags__slug'
+    tags = filters.MultipleChoiceFilter(
+        method='get_tags'
+    )
+    author = filters.NumberFilter(
+        field_name='author'
+    )
+    search = filters.CharFilter(
+        method='get_search'
     )
 
     class Meta:
@@ -20,18 +49,54 @@ class RecipeFilter(filters.FilterSet):
             'is_favorited',
             'is_in_shopping_cart',
             'author',
-            'tags'
+            'tags',
+            'search'
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Варианты считаются лениво: без ?tags= словарь не нужен.
+        # Лямбда, а не метод: форма глубоко копирует варианты.
+        self.filters['tags'].extra['choices'] = lambda: self.tag_choices()
+
+    @cached_property
+    def tag_ids(self):
+        return tag_ids()
+
+    def tag_choices(self):
+        return [(slug, slug) for slug in self.tag_ids]
+
+    def user_recipes(self, queryset, model):
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(Exists(model.objects.filter(
+            user=user, recipe=OuterRef('pk')
+        )))
+
     def get_favorite(self, queryset, name, value):
         if value:
-            return queryset.filter(favorite__user=self.request.user)
+            return self.user_recipes(queryset, Favorite)
+        return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         if value:
-            return Recipe.objects.filter(
-                shoplist__user=self.request.user
-            )
+            return self.user_recipes(queryset, Shoplist)
+        return queryset
+
+    def get_tags(self, queryset, name, value):
+        if value:
+            ids = self.tag_ids
+            # EXISTS вместо JOIN: рецепт с несколькими тегами из запроса
+            # не дублируется, и DISTINCT не нужен.
+            return queryset.filter(Exists(RecipeTags.objects.filter(
+                recipe=OuterRef('pk'),
+                tag__in=[ids[slug] for slug in value if slug in ids]
+            )))
+        return queryset
+
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
 
 
 class IngredientFilter(filters.FilterSet):
@@ -0,0 +1,103 @@
+import logging
+from io import BytesIO
+from pathlib import PurePath
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+logger = logging.getLogger('foodgram.images')
+
+VARIANTS = {
+    'preview': (240, 240),
+    'card': (640, 640),
+    'full': (1600, 1600),
+}
+FORMAT = 'WEBP'
+QUALITY = 80
+
+
+def variant_field(variant):
+    return f'image_{variant}'
+
+
+IMAGE_FIELDS = ('image', *map(variant_field, VARIANTS))
+
+
+def image_files(recipe):
+    """Имена файлов картинки рецепта и её копий."""
+    return {getattr(recipe, field).name for field in IMAGE_FIELDS} - {
+        '', None
+    }
+
+
+def delete_files(names):
+    """Удаляет файлы после коммита: при откате они ещё нужны."""
+    storage = Recipe._meta.get_field('image').storage
+
+    def delete():
+        for name in names:
+            try:
+                storage.delete(name)
+            except Exception:
+                logger.exception('Не удалось удалить файл %s', name)
+
+    if names:
+        transaction.on_commit(delete)
+
+
+def render_variant(image, size):
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    buf = BytesIO()
+    variant.save(buf, FORMAT, quality=QUALITY, method=4)
+    return buf.getvalue()
+
+
+def make_variants(recipe):
+    """Сохраняет уменьшенные копии картинки рецепта в WebP."""
+    original = recipe.image.name
+    with recipe.image.open('rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info
+                              else 'RGB')
+    stem = PurePath(original).stem
+    names = {}
+    for variant, size in VARIANTS.items():
+        field = getattr(recipe, variant_field(variant))
+        field.save(
+            f'{stem}_{variant}.webp',
+            ContentFile(render_variant(image, size)),
+            save=False
+        )
+        names[variant_field(variant)] = field.name
+    # Картинку могли заменить, пока шла обработка.
+    if not Recipe.objects.filter(pk=recipe.pk, image=original).update(
+        **names
+    ):
+        for variant in VARIANTS:
+            getattr(recipe, variant_field(variant)).delete(save=False)
+
+
+def process_pending(limit):
+    """Обрабатывает рецепты, у которых ещё нет уменьшенных копий."""
+    pending = Recipe.objects.exclude(image='').filter(
+        image_card=''
+    ).order_by('pk')[:limit]
+    processed = 0
+    for recipe in pending:
+        try:
+            make_variants(recipe)
+        except Exception:
+            logger.exception('Не удалось обработать картинку %s', recipe.pk)
+            # Без копий отдаётся оригинал, повторно не обрабатываем.
+            Recipe.objects.filter(pk=recipe.pk).update(**{
+                variant_field(variant): recipe.image.name
+                for variant in VARIANTS
+            })
+        processed += 1
+    return processed
@@ -0,0 +1,259 @@
+import json
+import time
+import tracemalloc
+from pathlib import Path
+from statistics import quantiles
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            Shoplist, Tag)
+from users.models import Follow, User
+from utils.cache import is_shared
+from utils.middleware import QueryCollector
+
+BENCH_EMAIL = 'bench-{}@foodgram.local'
+
+
+class Rollback(Exception):
+    pass
+
+
+class Fixture:
+    """Пользователи и рецепты для сценариев; откатываются после замеров."""
+
+    def __init__(self):
+        self.tags = list(Tag.objects.order_by('pk')[:2])
+        self.ingredients = list(Ingredient.objects.order_by('pk')[:5])
+        if not self.tags or not self.ingredients:
+            raise CommandError(
+                'Нет тегов или ингредиентов: выполните load_data'
+            )
+        self.user, self.author = (
+            User.objects.create_user(
+                email=BENCH_EMAIL.format(name), username=f'bench-{name}',
+                first_name=name, last_name=name, password=None
+            ) for name in ('reader', 'author')
+        )
+        self.recipes = [
+            self.create_recipe(f'Рецепт {number}') for number in range(5)
+        ] + list(Recipe.objects.order_by('-pub_date')[5:20])
+        self.own = self.create_recipe('Свой рецепт', author=self.user)
+        Follow.objects.create(user=self.user, following=self.author)
+        for recipe in self.recipes[::2]:
+            Favorite.objects.create(user=self.user, recipe=recipe)
+        for recipe in self.recipes[:5]:
+            Shoplist.objects.create(user=self.user, recipe=recipe)
+        self.client = APIClient()
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.anon = APIClient()
+
+    def create_recipe(self, name, author=None):
+        recipe = Recipe.objects.create(
+            author=author or self.author, name=name, text=name,
+            cooking_time=10
+        )
+        recipe.tags.set(self.tags)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=100)
+            for ingredient in self.ingredients
+        )
+        return recipe
+
+    def payload(self, name):
+        return {
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 15,
+            'tags': [tag.pk for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.pk, 'amount': 50 + number}
+                for number, ingredient in enumerate(self.ingredients)
+            ],
+        }
+
+
+def scenarios(fixture):
+    """Имя, клиент, метод, адрес, данные и ожидаемый статус."""
+    tags = '&'.join(f'tags={tag.slug}' for tag in fixture.tags)
+    prefix = fixture.ingredients[0].name[:2]
+    return [
+        ('recipes_list_anon', fixture.anon, 'get', '/api/recipes/',
+         None, 200),
+        ('recipes_list_auth', fixture.client, 'get', '/api/recipes/',
+         None, 200),
+        ('recipes_list_tags', fixture.client, 'get',
+         f'/api/recipes/?{tags}', None, 200),
+        ('recipes_list_favorited', fixture.client, 'get',
+         '/api/recipes/?is_favorited=1', None, 200),
+        ('recipes_list_cart', fixture.client, 'get',
+         '/api/recipes/?is_in_shopping_cart=1', None, 200),
+        ('recipe_detail', fixture.client, 'get',
+         f'/api/recipes/{fixture.recipes[0].pk}/', None, 200),
+        ('recipe_create', fixture.client, 'post', '/api/recipes/',
+         fixture.payload('Новый рецепт'), 201),
+        ('recipe_update', fixture.client, 'patch',
+         f'/api/recipes/{fixture.own.pk}/', fixture.payload('Правка'), 200),
+        ('subscriptions', fixture.client, 'get',
+         '/api/users/subscriptions/', None, 200),
+        ('ingredient_autocomplete', fixture.anon, 'get',
+         f'/api/ingredients/?name={prefix}', None, 200),
+        ('download_shopping_cart', fixture.client, 'get',
+         '/api/recipes/download_shopping_cart/', None, 200),
+    ]
+
+
+def percentile(values, point):
+    if len(values) < 2:
+        return values[0]
+    return quantiles(values, n=100, method='inclusive')[point - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'In-process benchmark of the main endpoints: latency percentiles, '
+        'queries and allocations per request, compared with a baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            help='Run only this scenario; can be repeated.'
+        )
+        parser.add_argument(
+            '--baseline',
+            type=Path,
+            default=settings.BASE_DIR / 'bench_baseline.json'
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Write the results as the new baseline.'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.25,
+            help='Allowed relative latency growth before failing.'
+        )
+
+    def handle(self, *args, **options):
+        # Очистка общего кэша сбросила бы его для всего сервиса, а данные
+        # откатываемых сценариев попали бы в него.
+        shared = [alias for alias in settings.CACHES if is_shared(alias)]
+        if shared:
+            raise CommandError(
+                f'Кэш {", ".join(shared)} общий для процессов: запустите '
+                'замеры с кэшем в памяти процесса (без CACHE_BACKEND)'
+            )
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        try:
+            with transaction.atomic():
+                results = self.run_all(options)
+                raise Rollback
+        except Rollback:
+            pass
+        if options['save_baseline']:
+            options['baseline'].write_text(
+                json.dumps(results, indent=2, sort_keys=True)
+            )
+            self.stdout.write(f'Базовые значения: {options["baseline"]}')
+            return
+        if options['baseline'].exists():
+            self.compare(
+                results,
+                json.loads(options['baseline'].read_text()),
+                options['tolerance']
+            )
+
+    def run_all(self, options):
+        fixture = Fixture()
+        selected = options['scenarios']
+        self.stdout.write(
+            f'{"scenario":<26}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}'
+            f'{"queries":>9}{"alloc KiB":>11}'
+        )
+        results = {}
+        for name, *request in scenarios(fixture):
+            if selected and name not in selected:
+                continue
+            results[name] = self.measure(name, *request, options)
+            result = results[name]
+            self.stdout.write(
+                f'{name:<26}{result["p50"]:>9.2f}{result["p95"]:>9.2f}'
+                f'{result["p99"]:>9.2f}{result["queries"]:>9}'
+                f'{result["alloc_kib"]:>11.1f}'
+            )
+        return results
+
+    @staticmethod
+    def call(name, client, method, url, data, expected):
+        if data is None:
+            response = getattr(client, method)(url)
+        else:
+            response = getattr(client, method)(url, data, format='json')
+        if response.status_code != expected:
+            raise CommandError(
+                f'{name}: {response.status_code} вместо {expected}'
+            )
+        b''.join(getattr(response, 'streaming_content', None) or [])
+        return response
+
+    def measure(self, name, client, method, url, data, expected, options):
+        request = (name, client, method, url, data, expected)
+        for _ in range(options['warmup']):
+            self.call(*request)
+        latencies = []
+        for _ in range(options['iterations']):
+            start = time.perf_counter()
+            self.call(*request)
+            latencies.append((time.perf_counter() - start) * 1000)
+        queries = QueryCollector()
+        with connection.execute_wrapper(queries):
+            self.call(*request)
+        tracemalloc.start()
+        self.call(*request)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'queries': queries.count,
+            'alloc_kib': peak / 1024,
+        }
+
+    def compare(self, results, baseline, tolerance):
+        regressions = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if base is None:
+                continue
+            if result['queries'] > base['queries']:
+                regressions.append(
+                    f'{name}: запросов {result["queries"]} '
+                    f'вместо {base["queries"]}'
+                )
+            for metric in ('p50', 'p95'):
+                if result[metric] > base[metric] * (1 + tolerance):
+                    regressions.append(
+                        f'{name}: {metric} {result[metric]:.2f} мс '
+                        f'вместо {base[metric]:.2f} мс'
+                    )
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно базовых значений:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write('Регрессий нет.')
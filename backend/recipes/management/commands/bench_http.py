@@ -0,0 +1,104 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+PATHS = (
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/recipes/',
+    '/api/recipes/{recipe}/',
+    '/api/users/subscriptions/',
+)
+
+
+def fetch(url, headers):
+    start = time.perf_counter()
+    try:
+        with urlopen(Request(url, headers=headers), timeout=30) as response:
+            response.read()
+            ok = True
+    except HTTPError as error:
+        ok = error.code == 304
+    except (URLError, OSError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(latencies, point):
+    if len(latencies) < 2:
+        return latencies[0] if latencies else 0
+    return quantiles(latencies, n=100, method='inclusive')[point - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load testing a running server: throughput and latency '
+        'of read endpoints, e.g. to compare WSGI and ASGI modes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'servers',
+            nargs='+',
+            help='Servers as name=http://host:port, e.g. wsgi=http://...'
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Path to request; can be repeated. {recipe} is replaced.'
+        )
+        parser.add_argument('--recipe', default='1')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument(
+            '--token',
+            help='Auth token; without it /users/subscriptions/ is skipped.'
+        )
+
+    def handle(self, *args, **options):
+        headers = {'Accept': 'application/json'}
+        paths = options['paths'] or PATHS
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        elif not options['paths']:
+            paths = [path for path in paths if 'subscriptions' not in path]
+        servers = []
+        for server in options['servers']:
+            name, sep, url = server.partition('=')
+            if not sep:
+                raise CommandError(f'Ожидается имя=адрес, получено {server}')
+            servers.append((name, url.rstrip('/')))
+        self.stdout.write(
+            f'{"mode":<8}{"path":<32}{"rps":>9}{"p50 ms":>9}'
+            f'{"p99 ms":>9}{"errors":>8}'
+        )
+        for path in paths:
+            path = path.format(recipe=options['recipe'])
+            for name, url in servers:
+                self.stdout.write(self.run(
+                    name, url + path, path, headers, options
+                ))
+
+    def run(self, name, url, path, headers, options):
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            list(pool.map(
+                lambda _: fetch(url, headers), range(options['warmup'])
+            ))
+            start = time.perf_counter()
+            results = list(pool.map(
+                lambda _: fetch(url, headers), range(options['requests'])
+            ))
+            elapsed = time.perf_counter() - start
+        latencies = [latency * 1000 for latency, ok in results if ok]
+        errors = len(results) - len(latencies)
+        return (
+            f'{name:<8}{path:<32}{len(results) / elapsed:>9.1f}'
+            f'{percentile(latencies, 50):>9.1f}'
+            f'{percentile(latencies, 99):>9.1f}{errors:>8}'
+        )
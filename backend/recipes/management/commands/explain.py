@@ -0,0 +1,185 @@
+import json
+import re
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F
+from django.http import QueryDict
+from rest_framework.settings import api_settings
+
+from recipes.filters import RecipeFilter
+from recipes.models import (Recipe, RecipeIngredient, RecipeTags,
+                            ShoplistTotal, Tag)
+from users.models import Follow, User
+
+FEED_ORDERING = ('-pub_date', 'id')
+SQLITE_SCAN = re.compile(r'^SCAN (\S+)$')
+
+
+def feed(context, **params):
+    """Первая страница ленты с фильтрами, как её строит RecipeViewSet."""
+    data = QueryDict(mutable=True)
+    for name, value in params.items():
+        data.setlist(name, value if isinstance(value, list) else [value])
+    queryset = RecipeFilter(
+        data,
+        queryset=Recipe.objects.all(),
+        request=SimpleNamespace(user=context.user)
+    ).qs
+    return queryset.order_by(*FEED_ORDERING)[:api_settings.PAGE_SIZE]
+
+
+HOT_QUERIES = {
+    'feed': feed,
+    'feed_author': lambda context: feed(context, author=context.author.pk),
+    'feed_tags': lambda context: feed(context, tags=context.tags),
+    'feed_favorited': lambda context: feed(context, is_favorited='1'),
+    'feed_cart': lambda context: feed(context, is_in_shopping_cart='1'),
+    'feed_recipe_tags': lambda context: RecipeTags.objects.filter(
+        recipe__in=context.page
+    ).select_related('tag'),
+    'feed_recipe_ingredients': lambda context: (
+        RecipeIngredient.objects.filter(
+            recipe__in=context.page
+        ).select_related('ingredient')
+    ),
+    'author_is_subscribed': lambda context: Follow.objects.filter(
+        user=context.user, following=context.author
+    ),
+    'author_followers': lambda context: Follow.objects.filter(
+        following=context.author
+    ),
+    'subscriptions': lambda context: User.objects.filter(
+        following__user=context.user
+    ),
+    'subscriptions_recipes': lambda context: Recipe.objects.filter(
+        author__in=list(context.user.follower.values_list(
+            'following', flat=True
+        ))
+    ).order_by(*FEED_ORDERING),
+    'cart_download': lambda context: ShoplistTotal.objects.filter(
+        user=context.user
+    ).values(
+        'amount',
+        ingredient_name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit')
+    ).order_by('ingredient__name'),
+    'cart_aggregate': lambda context: (
+        ShoplistTotal.objects.live_totals_query([context.user])
+    ),
+}
+
+
+class Context:
+    """Самые активные пользователь и автор, на которых строятся запросы."""
+
+    def __init__(self, email=None):
+        users = User.objects.all()
+        if email:
+            users = users.filter(email=email)
+        self.user = users.order_by('-following_count', 'pk').first()
+        self.author = User.objects.order_by('-recipes_count', 'pk').first()
+        if self.user is None or self.author is None:
+            raise CommandError('Нет пользователей: выполните seed')
+        self.tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        self.page = list(feed(self).values_list('pk', flat=True))
+
+
+def postgresql_plan(cursor, sql, params, analyze):
+    cursor.execute(
+        f'EXPLAIN (FORMAT JSON, ANALYZE {"TRUE" if analyze else "FALSE"}) '
+        f'{sql}',
+        params
+    )
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scans = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(node['Relation Name'])
+        nodes.extend(node.get('Plans', []))
+    return json.dumps(plan, indent=2), scans
+
+
+def sqlite_plan(cursor, sql, params, analyze):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+    details = [row[3] for row in cursor.fetchall()]
+    scans = [
+        match[1] for match in map(SQLITE_SCAN.match, details) if match
+    ]
+    return '\n'.join(details), scans
+
+
+PLANS = {'postgresql': postgresql_plan, 'sqlite': sqlite_plan}
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAIN of the hot querysets (feed, filters, subscriptions, '
+        'shopping cart) with sequential scans flagged.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--query',
+            action='append',
+            dest='queries',
+            choices=sorted(HOT_QUERIES),
+            help='Explain only this query; can be repeated.'
+        )
+        parser.add_argument(
+            '--user',
+            help='Email of the user the queries are built for.'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Execute the queries (PostgreSQL EXPLAIN ANALYZE).'
+        )
+        parser.add_argument(
+            '--disable-seqscan',
+            action='store_true',
+            help=(
+                'Set enable_seqscan = off on PostgreSQL, so on a small '
+                'database only scans without a usable index remain.'
+            )
+        )
+        parser.add_argument(
+            '--allow',
+            action='append',
+            default=['recipes_tag', 'recipes_dataversion'],
+            help='Table whose sequential scans are expected.'
+        )
+
+    def handle(self, *args, **options):
+        plan = PLANS.get(connection.vendor)
+        if plan is None:
+            raise CommandError(f'EXPLAIN для {connection.vendor} не поддержан')
+        context = Context(options['user'])
+        flagged = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            if options['disable_seqscan'] and plan is postgresql_plan:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            for name, build in HOT_QUERIES.items():
+                if options['queries'] and name not in options['queries']:
+                    continue
+                sql, params = build(context).query.sql_with_params()
+                text, scans = plan(cursor, sql, params, options['analyze'])
+                scans = [
+                    table for table in scans if table not in options['allow']
+                ]
+                self.stdout.write(
+                    f'{name}: последовательное чтение {", ".join(scans)}'
+                    if scans else f'{name}: OK'
+                )
+                if options['verbosity'] > 1:
+                    self.stdout.write(text)
+                flagged.extend(f'{name}: {table}' for table in scans)
+        if flagged:
+            raise CommandError(
+                'Последовательное чтение таблиц:\n' + '\n'.join(flagged)
+            )
@@ -0,0 +1,142 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import DataVersion, Ingredient, Tag
+
+TAGS = [
+    ('Десерты', '#cc6699', 'desserts'),
+    ('Напитки', '#339999', 'drinks'),
+    ('Салаты', '#00cc66', 'salads'),
+]
+
+
+def read_ingredients(path):
+    """Пары (название, единица измерения) из CSV или JSON."""
+    with open(path, encoding='utf-8') as file:
+        if path.suffix == '.json':
+            for item in json.load(file):
+                yield item['name'], item['measurement_unit']
+        else:
+            for name, measurement_unit in csv.reader(file):
+                yield name, measurement_unit
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class CSVStream:
+    """Файлоподобный поток CSV-строк для COPY без буфера на весь файл."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.writer = csv.writer(self)
+        self.buffer = ''
+        self.count = 0
+
+    def write(self, line):
+        self.buffer += line
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.writer.writerow(row)
+            self.count += 1
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+
+class Command(BaseCommand):
+    help = 'Loading ingredients and tags in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            type=Path,
+            default=settings.BASE_DIR / 'data' / 'ingredients.csv',
+            help='CSV or JSON file with ingredients.'
+        )
+        parser.add_argument(
+            '--only',
+            choices=('ingredients', 'tags'),
+            help='Load only one kind of data.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['only'] != 'tags':
+            path = options['ingredients']
+            if not path.exists():
+                raise CommandError(f'Файл {path} не найден')
+            rows = read_ingredients(path)
+            if connection.vendor == 'postgresql':
+                total, inserted = self.copy_ingredients(rows)
+            else:
+                total, inserted = self.bulk_load(
+                    Ingredient,
+                    (Ingredient(name=name, measurement_unit=unit)
+                     for name, unit in rows),
+                    options['batch_size']
+                )
+            if inserted:
+                DataVersion.objects.bump(DataVersion.INGREDIENTS)
+            self.report('Ингредиенты', total, inserted)
+        if options['only'] != 'ingredients':
+            total, inserted = self.bulk_load(
+                Tag,
+                (Tag(name=name, color=color, slug=slug)
+                 for name, color, slug in TAGS),
+                options['batch_size']
+            )
+            if inserted:
+                DataVersion.objects.bump(DataVersion.TAGS)
+            self.report('Теги', total, inserted)
+
+    def report(self, title, total, inserted):
+        self.stdout.write(
+            f'{title}: добавлено {inserted}, пропущено {total - inserted}'
+        )
+
+    @staticmethod
+    def bulk_load(model, objects, batch_size):
+        total = 0
+        with transaction.atomic():
+            before = model.objects.count()
+            for batch in batches(objects, batch_size):
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+            return total, model.objects.count() - before
+
+    @staticmethod
+    def copy_ingredients(rows):
+        """COPY во временную таблицу и одна вставка без конфликтов."""
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        stream = CSVStream(rows)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredient_staging '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY ingredient_staging FROM STDIN WITH (FORMAT csv)',
+                stream
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT name, measurement_unit '
+                'FROM ingredient_staging '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            return stream.count, cursor.rowcount
@@ -1,19 +1,9 @@
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
-from recipes.models import Tag
-
-data = [
-    ('Десерты', '#cc6699', 'desserts'),
-    ('Напитки', '#339999', 'drinks'),
-    ('Салаты', '#00cc66', 'salads'),
-]
-
 
 class Command(BaseCommand):
     help = 'Loading tags.'
 
     def handle(self, *args, **options):
-        print('Загрузка началась')
-        for name, color, slug in data:
-            Tag.objects.get_or_create(name=name, color=color, slug=slug)
-        print('Загрузка закончилась')
+        call_command('load_data', only='tags', stdout=self.stdout)
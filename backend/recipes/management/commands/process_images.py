@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from recipes.images import process_pending
+
+
+class Command(BaseCommand):
+    help = 'Generating recipe image variants in the background.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process pending images and exit.'
+        )
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait when there is nothing to process.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            processed = process_pending(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Обработано картинок: {processed}')
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['interval'])
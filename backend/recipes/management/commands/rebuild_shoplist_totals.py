@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import ShoplistTotal
+
+
+class Command(BaseCommand):
+    help = 'Rebuilding shopping list totals and checking them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare the totals with the live aggregate.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            ShoplistTotal.objects.rebuild()
+            self.stdout.write('Итоги пересобраны')
+        live = ShoplistTotal.objects.live_totals()
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in ShoplistTotal.objects.values_list(
+                'user', 'ingredient', 'amount'
+            )
+        }
+        mismatches = [
+            (key, stored.get(key), live.get(key))
+            for key in live.keys() | stored.keys()
+            if stored.get(key) != live.get(key)
+        ]
+        for (user_id, ingredient_id), stored_amount, live_amount in sorted(
+            mismatches, key=lambda mismatch: mismatch[0]
+        ):
+            self.stderr.write(
+                f'user={user_id} ingredient={ingredient_id} '
+                f'stored={stored_amount} live={live_amount}'
+            )
+        if mismatches:
+            raise CommandError(f'Расхождений: {len(mismatches)}')
+        self.stdout.write(f'Итоги совпадают, строк: {len(live)}')
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, Shoplist
+from users.models import Follow, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_carts_count', Shoplist, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'following'),
+    (User, 'following_count', Follow, 'user'),
+)
+
+
+def count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recounting denormalized counters.'
+
+    def handle(self, *args, **options):
+        for model, counter, related, field in COUNTERS:
+            with transaction.atomic():
+                drifted = model.objects.exclude(
+                    **{counter: count(related, field)}
+                )
+                fixed = model.objects.filter(
+                    pk__in=list(drifted.values_list('pk', flat=True))
+                ).update(**{counter: count(related, field)})
+            self.stdout.write(
+                f'{model._meta.label}.{counter}: исправлено {fixed}'
+            )
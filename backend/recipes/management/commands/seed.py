@@ -0,0 +1,199 @@
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from recipes.management.commands.load_data import CSVStream, batches
+from recipes.management.commands.recount import COUNTERS, count
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTags, Shoplist, ShoplistTotal, Tag)
+from users.models import Follow, User
+
+PASSWORD = 'foodgram-seed'
+
+
+class Zipf:
+    """Выбор элементов с популярностью по закону Ципфа."""
+
+    def __init__(self, rng, items, exponent):
+        self.rng = rng
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(self.items) + 1)
+        ))
+
+    def choices(self, k):
+        return self.rng.choices(self.items, cum_weights=self.weights, k=k)
+
+
+class Command(BaseCommand):
+    help = (
+        'Generating a deterministic synthetic dataset with Zipf-skewed '
+        'authors, favorites, carts and follows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--carts', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--zipf',
+            type=float,
+            default=1.1,
+            help='Exponent of the popularity distribution.'
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if not Tag.objects.exists() or not Ingredient.objects.exists():
+            call_command('load_data', stdout=self.stdout)
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(users, options)
+            self.create_links(users, recipes, options)
+            self.update_derived(users[0], recipes[0])
+
+    def write_rows(self, model, fields, rows):
+        """Потоковая запись связей без дубликатов: COPY или bulk_create."""
+        if connection.vendor != 'postgresql':
+            for batch in batches(rows, self.batch_size):
+                model.objects.bulk_create(
+                    (model(**dict(zip(fields, row))) for row in batch),
+                    ignore_conflicts=True
+                )
+            return
+        table = connection.ops.quote_name(model._meta.db_table)
+        columns = ', '.join(fields)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE seed_staging AS '
+                f'SELECT {columns} FROM {table} WITH NO DATA'
+            )
+            cursor.copy_expert(
+                f'COPY seed_staging ({columns}) FROM STDIN WITH (FORMAT csv)',
+                CSVStream(rows)
+            )
+            cursor.execute(
+                f'INSERT INTO {table} ({columns}) '
+                f'SELECT {columns} FROM seed_staging ON CONFLICT DO NOTHING'
+            )
+            cursor.execute('DROP TABLE seed_staging')
+
+    def create_users(self, total):
+        start = (User.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        password = make_password(PASSWORD)
+        ids = []
+        for batch in batches(range(start, start + total), self.batch_size):
+            users = User.objects.bulk_create(
+                User(
+                    email=f'user{number}@example.com',
+                    username=f'user{number}',
+                    first_name=f'Имя{number}',
+                    last_name=f'Фамилия{number}',
+                    password=password
+                ) for number in batch
+            )
+            ids.extend(user.pk for user in users)
+        self.stdout.write(f'Пользователи: {len(ids)}, пароль {PASSWORD}')
+        return ids
+
+    def create_recipes(self, users, options):
+        authors = Zipf(self.rng, users, options['zipf'])
+        tags = list(Tag.objects.values_list('pk', flat=True))
+        ingredients = list(Ingredient.objects.values_list('pk', flat=True))
+        per_recipe = min(options['ingredients_per_recipe'], len(ingredients))
+        now = timezone.now()
+        span = options['days'] * 24 * 60
+        ids = []
+        for batch in batches(range(options['recipes']), self.batch_size):
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    author_id=author,
+                    name=f'Рецепт {len(ids) + number + 1}',
+                    text='Синтетический рецепт для нагрузочных проверок.',
+                    cooking_time=self.rng.randint(5, 180)
+                ) for number, author in enumerate(authors.choices(len(batch)))
+            )
+            # pub_date заполняется auto_now_add, поэтому даты
+            # разносятся отдельным обновлением.
+            for recipe in recipes:
+                recipe.pub_date = recipe.updated_at = now - timedelta(
+                    minutes=self.rng.randrange(span)
+                )
+            Recipe.objects.bulk_update(
+                recipes, ['pub_date', 'updated_at'], batch_size=1000
+            )
+            self.write_rows(
+                RecipeIngredient, ('recipe_id', 'ingredient_id', 'amount'),
+                (
+                    (recipe.pk, ingredient, self.rng.randint(1, 500))
+                    for recipe in recipes
+                    for ingredient in self.rng.sample(ingredients, per_recipe)
+                )
+            )
+            self.write_rows(
+                RecipeTags, ('recipe_id', 'tag_id'),
+                (
+                    (recipe.pk, tag)
+                    for recipe in recipes
+                    for tag in self.rng.sample(
+                        tags, self.rng.randint(1, len(tags))
+                    )
+                )
+            )
+            ids.extend(recipe.pk for recipe in recipes)
+        self.stdout.write(f'Рецепты: {len(ids)}')
+        return ids
+
+    def pairs(self, users, targets, total, exponent, skip_self):
+        """Пары (пользователь, популярный объект).
+
+        При skip_self объекты — тоже пользователи, и пары с самим собой
+        пропускаются.
+        """
+        targets = Zipf(self.rng, targets, exponent)
+        for batch in batches(range(total), self.batch_size):
+            for target in targets.choices(len(batch)):
+                user = self.rng.choice(users)
+                if not skip_self or user != target:
+                    yield user, target
+
+    def create_links(self, users, recipes, options):
+        exponent = options['zipf']
+        for model, fields, targets, option, skip_self in (
+            (Favorite, ('user_id', 'recipe_id'), recipes, 'favorites', False),
+            (Shoplist, ('user_id', 'recipe_id'), recipes, 'carts', False),
+            (Follow, ('user_id', 'following_id'), users, 'follows', True),
+        ):
+            self.write_rows(model, fields, self.pairs(
+                users, targets, options[option], exponent, skip_self
+            ))
+            self.stdout.write(
+                f'{model._meta.verbose_name}: до {options[option]} записей'
+            )
+
+    def update_derived(self, first_user, first_recipe):
+        """Счётчики и итоги корзин: массовая вставка обходит сигналы."""
+        first = {User: first_user, Recipe: first_recipe}
+        for model, counter, related, field in COUNTERS:
+            model.objects.filter(pk__gte=first[model]).update(
+                **{counter: count(related, field)}
+            )
+        ShoplistTotal.objects.insert_live_totals(
+            User.objects.filter(pk__gte=first_user)
+        )
+        self.stdout.write('Счётчики и итоги корзин обновлены')
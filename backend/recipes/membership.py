@@ -0,0 +1,67 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from utils.cache import is_shared
+from .models import Favorite, Shoplist
+
+FAVORITES = 'favorites'
+CART = 'cart'
+KINDS = {
+    FAVORITES: Favorite,
+    CART: Shoplist,
+}
+
+
+def version_key(kind, user_id):
+    return f'recipe-ids-version:{kind}:{user_id}'
+
+
+def cache_key(kind, user_id, version):
+    return f'recipe-ids:{kind}:{user_id}:{version}'
+
+
+def get_version(kind, user_id):
+    key = version_key(kind, user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def recipe_ids(user, kind, memo=None):
+    """Множество id рецептов в избранном или корзине пользователя.
+
+    Берётся из memo запроса, затем из общего кэша и только потом из БД.
+    Кэш в памяти процесса не используется: его не сбросить из других
+    процессов.
+    """
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    if memo is not None and kind in memo:
+        return memo[kind]
+    ids = key = None
+    if is_shared():
+        key = cache_key(kind, user.pk, get_version(kind, user.pk))
+        ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(KINDS[kind].objects.filter(
+            user=user
+        ).values_list('recipe_id', flat=True))
+        if key:
+            cache.set(key, ids, settings.RECIPE_IDS_CACHE_TIMEOUT)
+    if memo is not None:
+        memo[kind] = ids
+    return ids
+
+
+def invalidate(kind, user_id):
+    """Новая версия ключа после коммита.
+
+    Множество, прочитанное из БД до коммита и записанное в кэш после,
+    останется под старой версией и больше не будет прочитано.
+    """
+    if is_shared():
+        cache.set(version_key(kind, user_id), time.time_ns(), None)
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.3 on 2026-10-18 19:34
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def fill_totals(apps, schema_editor):
+    Shoplist = apps.get_model('recipes', 'Shoplist')
+    ShoplistTotal = apps.get_model('recipes', 'ShoplistTotal')
+    totals = Shoplist.objects.filter(
+        recipe__recipe_ingredient__isnull=False
+    ).values(
+        'user', 'recipe__recipe_ingredient__ingredient'
+    ).annotate(
+        total=Sum('recipe__recipe_ingredient__amount')
+    ).values_list(
+        'user', 'recipe__recipe_ingredient__ingredient', 'total'
+    ).order_by()
+    ShoplistTotal.objects.bulk_create(
+        (
+            ShoplistTotal(
+                user_id=user_id, ingredient_id=ingredient_id, amount=amount
+            ) for user_id, ingredient_id, amount in totals.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='cooking_time',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1, message='Укажите число больше нуля.'), django.core.validators.MaxValueValidator(32767, message='Укажите число меньше.')], verbose_name='Время приготовления'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(upload_to='photos/', verbose_name='Картинка'),
+        ),
+        migrations.CreateModel(
+            name='ShoplistTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shoplist_totals', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shoplist_totals', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Итог списка покупок',
+                'verbose_name_plural': 'Итоги списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoplisttotal',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shoplist_total'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(text, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX recipes_recipe_search_vector_idx
+    ON recipes_recipe USING gin (search_vector)
+    """,
+    """
+    CREATE INDEX recipes_recipe_name_trgm_idx
+    ON recipes_recipe USING gin (name gin_trgm_ops)
+    """,
+]
+
+POSTGRES_BACKWARD = [
+    'DROP INDEX IF EXISTS recipes_recipe_name_trgm_idx',
+    'DROP INDEX IF EXISTS recipes_recipe_search_vector_idx',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+]
+
+# Триггеры синхронизации создаются в recipes.search после каждой
+# миграции: SQLite теряет их при пересоздании таблицы рецептов.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5(
+        name, text,
+        content='recipes_recipe', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_update',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_delete',
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_insert',
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_BACKWARD),
+    'sqlite': (SQLITE_FORWARD, SQLITE_BACKWARD),
+}
+
+
+def run(schema_editor, direction):
+    statements = STATEMENTS.get(schema_editor.connection.vendor)
+    if statements:
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+
+
+def forward(apps, schema_editor):
+    run(schema_editor, 0)
+
+
+def backward(apps, schema_editor):
+    run(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_shoplisttotal'),
+    ]
+
+    operations = [
+        migrations.RunPython(forward, backward),
+    ]
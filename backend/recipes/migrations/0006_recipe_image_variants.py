@@ -0,0 +1,28 @@
+# Generated by Django 4.2.3 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_card',
+            field=models.ImageField(blank=True, editable=False, upload_to='photos/variants/', verbose_name='Картинка для карточки'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_full',
+            field=models.ImageField(blank=True, editable=False, upload_to='photos/variants/', verbose_name='Картинка для страницы рецепта'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_preview',
+            field=models.ImageField(blank=True, editable=False, upload_to='photos/variants/', verbose_name='Картинка для превью'),
+        ),
+    ]
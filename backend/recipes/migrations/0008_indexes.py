@@ -0,0 +1,39 @@
+# Generated by Django 4.2.3 on 2026-10-18 20:01
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_tags(apps, schema_editor):
+    RecipeTags = apps.get_model('recipes', 'RecipeTags')
+    keep = RecipeTags.objects.values('recipe', 'tag').annotate(
+        first=Min('pk')
+    ).values_list('first', flat=True)
+    RecipeTags.objects.exclude(pk__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_updated_at_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-pub_date', 'id'], name='recipe_feed'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', 'id'], name='recipe_author_feed'),
+        ),
+        migrations.AddIndex(
+            model_name='recipetags',
+            index=models.Index(fields=['tag', 'recipe'], name='recipe_tag_by_tag'),
+        ),
+        migrations.RunPython(remove_duplicate_tags, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='recipetags',
+            constraint=models.UniqueConstraint(fields=('recipe', 'tag'), name='unique_recipe_tag'),
+        ),
+    ]
@@ -1,11 +1,16 @@
 from colorfield.fields import ColorField
 
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import UniqueConstraint
+from django.db import connections, models, transaction
+from django.db.models import (Exists, F, OuterRef, Prefetch, Sum,
+                              UniqueConstraint, Value)
+from django.dispatch import Signal
+from django.utils import timezone
 
 from users.models import User
+from utils.cache import is_shared
 from utils.constants import RECIPE_APPM_MAX_LENGTH, MAX_VALIDATOR
+from utils.models import CountersMixin
 
 
 class Tag(models.Model):
@@ -61,7 +66,104 @@ class Ingredient(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """Выборка рецептов со всем, что нужно для их отображения."""
+
+    def with_user_data(self, user):
+        """Связанные объекты, подписка на автора, избранное и корзина.
+
+        Количество запросов не зависит от числа рецептов на странице.
+        С общим кэшем избранное и корзина берутся из множеств id
+        (recipes.membership) и в запрос не добавляются.
+        """
+        authors = User.objects.all()
+        queryset = self
+        if user.is_authenticated:
+            authors = authors.annotate(is_subscribed=Exists(
+                user.follower.filter(following=OuterRef('pk'))
+            ))
+            if not is_shared():
+                queryset = queryset.annotate(
+                    is_favorited=Exists(
+                        user.favorite.filter(recipe=OuterRef('pk'))
+                    ),
+                    is_in_shopping_cart=Exists(
+                        user.shoplist.filter(recipe=OuterRef('pk'))
+                    ),
+                )
+        else:
+            authors = authors.annotate(is_subscribed=Value(False))
+        return queryset.prefetch_related(
+            Prefetch('author', queryset=authors),
+            'tags',
+            Prefetch(
+                'recipe_ingredient',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ),
+        )
+
+    def lock(self):
+        """Блокирует рецепты до конца транзакции.
+
+        FOR NO KEY UPDATE не мешает вставке строк, ссылающихся
+        на рецепт, но упорядочивает изменения самого рецепта.
+        """
+        return list(self.select_for_update(no_key=True).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+
+class DataVersionManager(models.Manager):
+
+    def bump(self, *names):
+        """Новая версия справочных данных после их изменения."""
+        for name in names:
+            if not self.filter(name=name).update(
+                version=F('version') + 1, updated_at=timezone.now()
+            ):
+                self.bulk_create(
+                    [self.model(name=name, version=1)],
+                    ignore_conflicts=True
+                )
+
+    def get_versions(self, *names):
+        return {
+            version.name: version
+            for version in self.filter(name__in=names)
+        }
+
+    async def aget_versions(self, *names):
+        return {
+            version.name: version
+            async for version in self.filter(name__in=names)
+        }
+
+
+class DataVersion(models.Model):
+    """Версия справочных данных: тегов и ингредиентов."""
+
+    TAGS = 'tags'
+    INGREDIENTS = 'ingredients'
+
+    name = models.CharField(
+        'Данные',
+        max_length=RECIPE_APPM_MAX_LENGTH,
+        primary_key=True
+    )
+    version = models.PositiveIntegerField('Версия', default=0)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+
+    objects = DataVersionManager()
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.name} {self.version}'
+
+
+class Recipe(CountersMixin, models.Model):
     """Рецепт."""
 
     author = models.ForeignKey(
@@ -78,6 +180,24 @@ class Recipe(models.Model):
         'Картинка',
         upload_to='photos/',
     )
+    image_full = models.ImageField(
+        'Картинка для страницы рецепта',
+        upload_to='photos/variants/',
+        blank=True,
+        editable=False
+    )
+    image_card = models.ImageField(
+        'Картинка для карточки',
+        upload_to='photos/variants/',
+        blank=True,
+        editable=False
+    )
+    image_preview = models.ImageField(
+        'Картинка для превью',
+        upload_to='photos/variants/',
+        blank=True,
+        editable=False
+    )
     name = models.CharField(
         'Название',
         max_length=RECIPE_APPM_MAX_LENGTH
@@ -103,11 +223,35 @@ class Recipe(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        'Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        'Добавлений в корзину',
+        default=0,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+    counter_fields = ('favorites_count', 'shopping_carts_count')
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(fields=['-pub_date', 'id'], name='recipe_feed'),
+            models.Index(
+                fields=['author', '-pub_date', 'id'],
+                name='recipe_author_feed'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -129,6 +273,15 @@ class RecipeTags(models.Model):
 
     class Meta:
         verbose_name = 'Связь рецепта и тега'
+        constraints = [
+            UniqueConstraint(
+                fields=['recipe', 'tag'],
+                name='unique_recipe_tag'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'recipe'], name='recipe_tag_by_tag'),
+        ]
 
     def __str__(self):
         return f'{self.recipe} {self.tag}'
@@ -170,6 +323,64 @@ class RecipeIngredient(models.Model):
         return f'{self.recipe} {self.ingredient} {self.amount}'
 
 
+# Пакетные изменения избранного и корзины идут в обход
+# post_save/post_delete, поэтому отправляют свои сигналы.
+recipes_added = Signal()
+recipes_removed = Signal()
+
+
+class UserRecipeManager(models.Manager):
+    """Пакетное добавление и удаление рецептов одним запросом."""
+
+    def execute(self, sql, params):
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(sql.format(
+                table=table,
+                recipes=connection.ops.quote_name(Recipe._meta.db_table),
+                placeholders=', '.join(['%s'] * (len(params) - 1))
+            ), params)
+            return [recipe_id for recipe_id, in cursor.fetchall()]
+
+    def add(self, user, recipe_ids):
+        """Id рецептов, которые действительно добавлены.
+
+        Уже добавленные и несуществующие рецепты пропускаются
+        самой вставкой, поэтому повторный запрос ничего не ломает.
+        """
+        if not recipe_ids:
+            return []
+        added = self.execute(
+            'INSERT INTO {table} (user_id, recipe_id) '
+            'SELECT %s, id FROM {recipes} WHERE id IN ({placeholders}) '
+            'ON CONFLICT (user_id, recipe_id) DO NOTHING '
+            'RETURNING recipe_id',
+            [user.pk, *recipe_ids]
+        )
+        if added:
+            recipes_added.send(
+                sender=self.model, user_id=user.pk, recipe_ids=added
+            )
+        return added
+
+    def remove(self, user, recipe_ids):
+        """Id рецептов, которые действительно удалены."""
+        if not recipe_ids:
+            return []
+        removed = self.execute(
+            'DELETE FROM {table} '
+            'WHERE user_id = %s AND recipe_id IN ({placeholders}) '
+            'RETURNING recipe_id',
+            [user.pk, *recipe_ids]
+        )
+        if removed:
+            recipes_removed.send(
+                sender=self.model, user_id=user.pk, recipe_ids=removed
+            )
+        return removed
+
+
 class UserRecipe(models.Model):
     """Вспомогательный класс для классов Favorite и ShopList."""
     user = models.ForeignKey(
@@ -181,6 +392,8 @@ class UserRecipe(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = UserRecipeManager()
+
     class Meta:
         abstract = True
 
@@ -211,3 +424,147 @@ class Shoplist(UserRecipe):
 
     def __str__(self):
         return f'{self.user} добавил рецепт «{self.recipe}» в корзину'
+
+
+class ShoplistTotalManager(models.Manager):
+    """Поддержка сводного списка покупок в актуальном состоянии."""
+
+    @staticmethod
+    def recipe_amounts(*recipes):
+        """Количество каждого ингредиента в рецептах."""
+        return dict(
+            RecipeIngredient.objects.filter(recipe__in=recipes).values(
+                'ingredient'
+            ).annotate(total=Sum('amount')).values_list('ingredient', 'total')
+        )
+
+    def apply(self, user_ids, deltas):
+        """Прибавляет к итогам пользователей изменения по ингредиентам."""
+        deltas = {
+            ingredient: delta for ingredient, delta in deltas.items() if delta
+        }
+        if not user_ids or not deltas:
+            return
+        with transaction.atomic():
+            # Блокировка пользователей упорядочивает параллельные
+            # изменения одной корзины.
+            list(User.objects.select_for_update().filter(
+                pk__in=user_ids
+            ).values_list('pk', flat=True))
+            totals = {
+                (total.user_id, total.ingredient_id): total
+                for total in self.filter(
+                    user__in=user_ids, ingredient__in=list(deltas)
+                )
+            }
+            to_create, to_update, to_delete = [], [], []
+            for user_id in user_ids:
+                for ingredient_id, delta in deltas.items():
+                    total = totals.get((user_id, ingredient_id))
+                    if total is None:
+                        if delta > 0:
+                            to_create.append(self.model(
+                                user_id=user_id,
+                                ingredient_id=ingredient_id,
+                                amount=delta
+                            ))
+                    elif total.amount + delta > 0:
+                        total.amount += delta
+                        to_update.append(total)
+                    else:
+                        to_delete.append(total.pk)
+            self.bulk_create(to_create)
+            self.bulk_update(to_update, ['amount'])
+            self.filter(pk__in=to_delete).delete()
+
+    def add_recipe(self, user_ids, *recipes, sign=1):
+        with transaction.atomic():
+            # Количество читается под блокировкой рецептов, поэтому
+            # правка ингредиентов не проскочит между чтением и записью.
+            Recipe.objects.filter(pk__in=recipes).lock()
+            self.apply(user_ids, {
+                ingredient: sign * amount
+                for ingredient, amount
+                in self.recipe_amounts(*recipes).items()
+            })
+
+    def remove_recipe(self, user_ids, *recipes):
+        self.add_recipe(user_ids, *recipes, sign=-1)
+
+    @staticmethod
+    def live_totals_query(users=None):
+        queryset = Shoplist.objects.all()
+        if users is not None:
+            queryset = queryset.filter(user__in=users)
+        return queryset.filter(
+            recipe__recipe_ingredient__isnull=False
+        ).values(
+            'user', 'recipe__recipe_ingredient__ingredient'
+        ).annotate(
+            total=Sum('recipe__recipe_ingredient__amount')
+        ).values_list(
+            'user', 'recipe__recipe_ingredient__ingredient', 'total'
+        ).order_by()
+
+    def live_totals(self, users=None):
+        """Итоги, посчитанные заново по корзинам."""
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in self.live_totals_query(users)
+        }
+
+    def insert_live_totals(self, users):
+        """Итоги пользователей, у которых их ещё нет, одним INSERT."""
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        sql, params = self.live_totals_query(users).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} (user_id, ingredient_id, amount) {sql}',
+                params
+            )
+
+    def rebuild(self):
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                self.model(
+                    user_id=user_id, ingredient_id=ingredient_id, amount=amount
+                )
+                for (user_id, ingredient_id), amount
+                in self.live_totals().items()
+            )
+
+
+class ShoplistTotal(models.Model):
+    """Сводный список покупок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        related_name='shoplist_totals',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        related_name='shoplist_totals',
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE
+    )
+    amount = models.PositiveIntegerField('Количество')
+
+    objects = ShoplistTotalManager()
+
+    class Meta:
+        verbose_name = 'Итог списка покупок'
+        verbose_name_plural = 'Итоги списков покупок'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shoplist_total'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient} {self.amount}'
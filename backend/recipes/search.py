@@ -0,0 +1,119 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+WORD = re.compile(r'\w+')
+
+SQLITE_TRIGGERS = {
+    'recipes_recipe_fts_insert': """
+        CREATE TRIGGER recipes_recipe_fts_insert
+        AFTER INSERT ON recipes_recipe
+        BEGIN
+            INSERT INTO recipes_recipe_fts (rowid, name, text)
+            VALUES (new.id, new.name, new.text);
+        END
+    """,
+    'recipes_recipe_fts_delete': """
+        CREATE TRIGGER recipes_recipe_fts_delete
+        AFTER DELETE ON recipes_recipe
+        BEGIN
+            INSERT INTO recipes_recipe_fts
+                (recipes_recipe_fts, rowid, name, text)
+            VALUES ('delete', old.id, old.name, old.text);
+        END
+    """,
+    'recipes_recipe_fts_update': """
+        CREATE TRIGGER recipes_recipe_fts_update
+        AFTER UPDATE OF name, text ON recipes_recipe
+        BEGIN
+            INSERT INTO recipes_recipe_fts
+                (recipes_recipe_fts, rowid, name, text)
+            VALUES ('delete', old.id, old.name, old.text);
+            INSERT INTO recipes_recipe_fts (rowid, name, text)
+            VALUES (new.id, new.name, new.text);
+        END
+    """,
+}
+
+
+def ensure_sqlite_index(using):
+    """Восстанавливает триггеры FTS5 и пересобирает индекс при их потере.
+
+    SQLite удаляет триггеры вместе с таблицей, а миграции пересоздают
+    таблицу рецептов при изменении её полей.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+            ' AND name LIKE %s',
+            ('recipes_recipe_fts%',)
+        )
+        existing = {name for name, in cursor.fetchall()}
+        if 'recipes_recipe_fts' not in existing:
+            return
+        missing = SQLITE_TRIGGERS.keys() - existing
+        for name in missing:
+            cursor.execute(SQLITE_TRIGGERS[name])
+        if missing:
+            cursor.execute(
+                'INSERT INTO recipes_recipe_fts (recipes_recipe_fts) '
+                "VALUES ('rebuild')"
+            )
+
+
+def sqlite_query(value):
+    """Запрос FTS5 из слов пользователя: все слова, каждое как префикс."""
+    return ' '.join(
+        '"{}"*'.format(word) for word in WORD.findall(value.casefold())
+    )
+
+
+def search_recipes(queryset, value):
+    """Рецепты, у которых название или текст совпадают с запросом.
+
+    Результат упорядочен по релевантности.
+    """
+    if not WORD.search(value):
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        matched = RawSQL(
+            "recipes_recipe.search_vector @@ "
+            "websearch_to_tsquery('russian', %s) "
+            "OR recipes_recipe.name %% %s",
+            (value, value),
+            output_field=BooleanField()
+        )
+        rank = RawSQL(
+            "ts_rank(recipes_recipe.search_vector, "
+            "websearch_to_tsquery('russian', %s)) "
+            "+ similarity(recipes_recipe.name, %s)",
+            (value, value),
+            output_field=FloatField()
+        )
+        return queryset.filter(matched).annotate(
+            search_rank=rank
+        ).order_by('-search_rank', '-pub_date')
+    if connection.vendor == 'sqlite':
+        query = sqlite_query(value)
+        found = RawSQL(
+            'SELECT rowid FROM recipes_recipe_fts '
+            'WHERE recipes_recipe_fts MATCH %s',
+            (query,)
+        )
+        rank = RawSQL(
+            'SELECT -bm25(recipes_recipe_fts, 10.0, 1.0) '
+            'FROM recipes_recipe_fts '
+            'WHERE recipes_recipe_fts MATCH %s '
+            'AND recipes_recipe_fts.rowid = recipes_recipe.id',
+            (query,),
+            output_field=FloatField()
+        )
+        return queryset.filter(id__in=found).annotate(
+            search_rank=rank
+        ).order_by('-search_rank', '-pub_date')
+    return queryset.filter(name__icontains=value)
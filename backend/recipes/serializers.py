@@ -1,13 +1,19 @@
+from collections import Counter, defaultdict
+
 from django.core.validators import MaxValueValidator, MinValueValidator
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 import webcolors
 
 from users.serializers import NewUserSerializer
+from utils.fields import BoundedImageField, ImageVariantField
+from .images import (IMAGE_FIELDS, VARIANTS as IMAGE_VARIANTS, delete_files,
+                     image_files, variant_field)
+from .membership import CART, FAVORITES, recipe_ids
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient, Shoplist,
-                     Tag)
-from utils.constants import MAX_VALIDATOR
+                     ShoplistTotal, Tag)
+from utils.constants import MAX_VALIDATOR, RECIPE_BATCH_MAX_SIZE
 
 
 class Hex2NameColor(serializers.Field):
@@ -73,7 +79,7 @@ class IngredientShowInRecipeSerializer(serializers.ModelSerializer):
 class AddIngredientInRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для добавления ингредиента в рецепт."""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         validators=[
             MinValueValidator(1, message='Укажите число больше нуля.'),
@@ -92,11 +98,8 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         read_only=True,
         default=serializers.CurrentUserDefault()
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all()
-    )
-    image = Base64ImageField(required=False, allow_null=True)
+    tags = serializers.ListField(child=serializers.IntegerField())
+    image = BoundedImageField(required=False, allow_null=True)
     ingredients = AddIngredientInRecipeSerializer(many=True)
     cooking_time = serializers.IntegerField(
         validators=[
@@ -113,6 +116,36 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
         model = Recipe
 
+    @staticmethod
+    def resolve(model, ids, error):
+        """Объекты по id одним запросом; все ненайденные id в одной ошибке."""
+        objects = model.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in objects]
+        if missing:
+            raise ValidationError(
+                f'{error}: {", ".join(map(str, dict.fromkeys(missing)))}'
+            )
+        return objects
+
+    def validate_tags(self, value):
+        tags = self.resolve(Tag, value, 'Теги не найдены')
+        return [tags[pk] for pk in dict.fromkeys(value)]
+
+    def validate_ingredients(self, value):
+        ids = [item['id'] for item in value]
+        duplicates = [pk for pk, count in Counter(ids).items() if count > 1]
+        if duplicates:
+            raise ValidationError(
+                'Ингредиенты указаны несколько раз: '
+                + ', '.join(map(str, duplicates))
+            )
+        ingredients = self.resolve(
+            Ingredient, ids, 'Ингредиенты не найдены'
+        )
+        return [
+            {**item, 'id': ingredients[item['id']]} for item in value
+        ]
+
     @staticmethod
     def add_ingredients(ingredients, recipe):
         ingredients_list = [
@@ -124,6 +157,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         ]
         RecipeIngredient.objects.bulk_create(ingredients_list)
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get('request').user
         tags = validated_data.pop('tags')
@@ -134,15 +168,77 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return recipe
 
     def to_representation(self, instance):
+        instance = Recipe.objects.with_user_data(
+            self.context['request'].user
+        ).get(pk=instance.pk)
         return RecipeShowSerializer(instance, context=self.context).data
 
+    @staticmethod
+    def update_shoplist_totals(recipe, deltas):
+        """Переносит изменения ингредиентов в корзины с этим рецептом."""
+        if not any(deltas.values()):
+            return
+        user_ids = list(recipe.shoplist.values_list('user', flat=True))
+        ShoplistTotal.objects.apply(user_ids, deltas)
+
+    @staticmethod
+    def update_ingredients(ingredients, recipe):
+        """Меняет только те строки ингредиентов, которые изменились.
+
+        Возвращает изменения количества по каждому ингредиенту.
+        """
+        existing = defaultdict(list)
+        deltas = defaultdict(int)
+        for row in RecipeIngredient.objects.filter(recipe=recipe):
+            existing[row.ingredient_id].append(row)
+            deltas[row.ingredient_id] -= row.amount
+        to_create, to_update = [], []
+        for ingredient in ingredients:
+            ingredient_id, amount = ingredient['id'].pk, ingredient['amount']
+            deltas[ingredient_id] += amount
+            if not existing[ingredient_id]:
+                to_create.append(RecipeIngredient(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                ))
+                continue
+            row = existing[ingredient_id].pop()
+            if row.amount != amount:
+                row.amount = amount
+                to_update.append(row)
+        to_delete = [row.pk for rows in existing.values() for row in rows]
+        if to_delete:
+            RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        return deltas
+
+    @transaction.atomic
     def update(self, recipe, validated_data):
+        # Блокировка до чтения ингредиентов и корзин: добавление
+        # в корзину дождётся правки и прочитает новые количества.
+        Recipe.objects.filter(pk=recipe.pk).lock()
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        RecipeIngredient.objects.filter(recipe=recipe).delete()
-        self.add_ingredients(ingredients, recipe)
+        old_files = set()
+        if validated_data.get('image'):
+            # Имена читаются после блокировки: обработчик картинок мог
+            # успеть записать копии после загрузки рецепта.
+            old_files = image_files(
+                Recipe.objects.only(*IMAGE_FIELDS).get(pk=recipe.pk)
+            )
+            # Копии пересоздаст обработчик картинок.
+            for variant in IMAGE_VARIANTS:
+                validated_data[variant_field(variant)] = ''
+        self.update_shoplist_totals(
+            recipe, self.update_ingredients(ingredients, recipe)
+        )
+        # set() сам пишет только добавленные и убранные теги.
         recipe.tags.set(tags)
-        return super().update(recipe, validated_data)
+        recipe = super().update(recipe, validated_data)
+        delete_files(old_files - image_files(recipe))
+        return recipe
 
 
 class RecipeShowSerializer(serializers.ModelSerializer):
@@ -154,10 +250,9 @@ class RecipeShowSerializer(serializers.ModelSerializer):
         source='recipe_ingredient',
         many=True
     )
-    image = Base64ImageField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField(required=False, allow_null=True)
+    image = ImageVariantField()
 
     class Meta:
         fields = (
@@ -174,13 +269,23 @@ class RecipeShowSerializer(serializers.ModelSerializer):
         )
         model = Recipe
 
-    def get_is_favorited(self, obj):
+    def recipe_ids(self, kind):
+        """Множество id, если флаг не пришёл аннотацией из with_user_data."""
         request = self.context.get('request')
-        return obj.favorite.filter(user__id=request.user.id).exists()
+        return recipe_ids(
+            request and request.user, kind,
+            self.context.setdefault('recipe_ids', {})
+        )
+
+    def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        return obj.pk in self.recipe_ids(FAVORITES)
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        return obj.shoplist.filter(user__id=request.user.id).exists()
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        return obj.pk in self.recipe_ids(CART)
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -194,7 +299,7 @@ class FavoriteSerializer(serializers.ModelSerializer):
         user = data['user']
         recipe = data['recipe']
         if Favorite.objects.filter(user=user, recipe=recipe).exists():
-            return ValidationError('Такой рецепт уже добавлен в избранное')
+            raise ValidationError('Такой рецепт уже добавлен в избранное')
         return data
 
 
@@ -209,5 +314,18 @@ class ShopListSerializer(serializers.ModelSerializer):
         user = data['user']
         recipe = data['recipe']
         if Shoplist.objects.filter(user=user, recipe=recipe).exists():
-            return ValidationError('Такой рецепт уже добавлен в корзину')
+            raise ValidationError('Такой рецепт уже добавлен в корзину')
         return data
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список рецептов для пакетного добавления и удаления."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPE_BATCH_MAX_SIZE
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
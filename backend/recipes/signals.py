@@ -0,0 +1,101 @@
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_delete)
+from django.db import transaction
+from django.dispatch import receiver
+
+from users.models import User
+from . import membership
+from .images import delete_files, image_files
+from .models import (DataVersion, Favorite, Ingredient, Recipe, Shoplist,
+                     ShoplistTotal, Tag, recipes_added, recipes_removed)
+from .search import ensure_sqlite_index
+
+
+def recipe_ids_changed(kind, user_id):
+    transaction.on_commit(lambda: membership.invalidate(kind, user_id))
+
+
+@receiver(post_save, sender=Shoplist)
+def shoplist_added(sender, instance, created, **kwargs):
+    if created:
+        ShoplistTotal.objects.add_recipe(
+            [instance.user_id], instance.recipe_id
+        )
+        Recipe.shift_counters(instance.recipe_id, 1, 'shopping_carts_count')
+        recipe_ids_changed(membership.CART, instance.user_id)
+
+
+@receiver(pre_delete, sender=Shoplist)
+def shoplist_removed(sender, instance, **kwargs):
+    ShoplistTotal.objects.remove_recipe([instance.user_id], instance.recipe_id)
+    Recipe.shift_counters(instance.recipe_id, -1, 'shopping_carts_count')
+    recipe_ids_changed(membership.CART, instance.user_id)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_added(sender, instance, created, **kwargs):
+    if created:
+        Recipe.shift_counters(instance.recipe_id, 1, 'favorites_count')
+        recipe_ids_changed(membership.FAVORITES, instance.user_id)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_removed(sender, instance, **kwargs):
+    Recipe.shift_counters(instance.recipe_id, -1, 'favorites_count')
+    recipe_ids_changed(membership.FAVORITES, instance.user_id)
+
+
+@receiver(recipes_added, sender=Shoplist)
+def shoplist_batch_added(sender, user_id, recipe_ids, **kwargs):
+    ShoplistTotal.objects.add_recipe([user_id], *recipe_ids)
+    Recipe.shift_many_counters(recipe_ids, 1, 'shopping_carts_count')
+    recipe_ids_changed(membership.CART, user_id)
+
+
+@receiver(recipes_removed, sender=Shoplist)
+def shoplist_batch_removed(sender, user_id, recipe_ids, **kwargs):
+    ShoplistTotal.objects.remove_recipe([user_id], *recipe_ids)
+    Recipe.shift_many_counters(recipe_ids, -1, 'shopping_carts_count')
+    recipe_ids_changed(membership.CART, user_id)
+
+
+@receiver(recipes_added, sender=Favorite)
+def favorites_batch_added(sender, user_id, recipe_ids, **kwargs):
+    Recipe.shift_many_counters(recipe_ids, 1, 'favorites_count')
+    recipe_ids_changed(membership.FAVORITES, user_id)
+
+
+@receiver(recipes_removed, sender=Favorite)
+def favorites_batch_removed(sender, user_id, recipe_ids, **kwargs):
+    Recipe.shift_many_counters(recipe_ids, -1, 'favorites_count')
+    recipe_ids_changed(membership.FAVORITES, user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_added(sender, instance, created, **kwargs):
+    if created:
+        User.shift_counters(instance.author_id, 1, 'recipes_count')
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_removed(sender, instance, **kwargs):
+    User.shift_counters(instance.author_id, -1, 'recipes_count')
+    delete_files(image_files(instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredients_changed(sender, **kwargs):
+    DataVersion.objects.bump(DataVersion.INGREDIENTS)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tags_changed(sender, **kwargs):
+    DataVersion.objects.bump(DataVersion.TAGS)
+
+
+@receiver(post_migrate)
+def recipes_migrated(sender, app_config, using, **kwargs):
+    if app_config.label == 'recipes':
+        ensure_sqlite_index(using)
@@ -0,0 +1,283 @@
+import base64
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.cache import cache
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APIClient, APITestCase
+
+from users.models import Follow, User
+from .images import image_files, process_pending
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient, Shoplist,
+                     Tag)
+
+RECIPES = 12
+
+
+class RecipeQueryCountTest(APITestCase):
+    """Число запросов списка и страницы рецепта не зависит от данных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = (
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name,
+                first_name=name, last_name=name, password=None
+            ) for name in ('author', 'reader')
+        )
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag-{number}')
+            for number in range(3)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(5)
+        )
+        cls.recipes = []
+        for number in range(RECIPES):
+            recipe = Recipe.objects.create(
+                author=(cls.author, cls.reader)[number % 2],
+                name=f'Рецепт {number}', text='Описание', cooking_time=10
+            )
+            recipe.tags.set(cls.tags[:number % 3 + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=10
+                ) for ingredient in cls.ingredients[:number % 5 + 1]
+            )
+            cls.recipes.append(recipe)
+        for recipe in cls.recipes[::2]:
+            Favorite.objects.create(user=cls.reader, recipe=recipe)
+        for recipe in cls.recipes[::3]:
+            Shoplist.objects.create(user=cls.reader, recipe=recipe)
+        Follow.objects.create(user=cls.reader, following=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.anon = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def assert_list_queries(self, client, queries):
+        for limit in (2, RECIPES):
+            with self.subTest(limit=limit), self.assertNumQueries(queries):
+                response = client.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(len(response.data['results']), limit)
+
+    def test_list_anonymous(self):
+        self.assert_list_queries(self.anon, 5)
+
+    def test_list_authenticated(self):
+        self.assert_list_queries(self.client, 5)
+
+    def test_list_filtered(self):
+        tags = '&'.join(f'tags={tag.slug}' for tag in self.tags)
+        expected = {
+            recipe.pk for recipe in self.recipes[::6]
+            if recipe.author == self.author
+        }
+        with self.assertNumQueries(7) as queries:
+            response = self.client.get(
+                f'/api/recipes/?limit={RECIPES}&{tags}'
+                f'&author={self.author.pk}&is_favorited=1'
+                '&is_in_shopping_cart=1'
+            )
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(set(ids), expected)
+        self.assertNotIn(
+            'DISTINCT',
+            ' '.join(query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_list_flags_shared_cache(self):
+        """С общим кэшем флаги берутся из множеств id, а не из Exists."""
+        url = f'/api/recipes/?limit={RECIPES}'
+        local = self.client.get(url).data['results']
+        self.assertTrue(any(recipe['is_favorited'] for recipe in local))
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': location,
+        }}):
+            # Первый запрос читает множества id из БД, второй — из кэша.
+            for queries in (7, 5):
+                with self.assertNumQueries(queries) as captured:
+                    shared = self.client.get(url).data['results']
+                self.assertEqual(shared, local)
+                self.assertNotIn(
+                    'EXISTS',
+                    ' '.join(
+                        query['sql'] for query in captured.captured_queries
+                        if 'recipes_favorite' in query['sql']
+                    )
+                )
+
+    def test_detail_anonymous(self):
+        with self.assertNumQueries(6):
+            response = self.anon.get(f'/api/recipes/{self.recipes[0].pk}/')
+        self.assertFalse(response.data['is_favorited'])
+
+    def test_detail_authenticated(self):
+        with self.assertNumQueries(6):
+            response = self.client.get(
+                f'/api/recipes/{self.recipes[0].pk}/'
+            )
+        self.assertTrue(response.data['is_favorited'])
+        self.assertTrue(response.data['is_in_shopping_cart'])
+
+    def test_create(self):
+        for size in (1, len(self.ingredients)):
+            data = {
+                'name': f'Новый рецепт {size}',
+                'text': 'Описание',
+                'cooking_time': 15,
+                'tags': [tag.pk for tag in self.tags[:size]],
+                'ingredients': [
+                    {'id': ingredient.pk, 'amount': 20}
+                    for ingredient in self.ingredients[:size]
+                ],
+            }
+            with self.subTest(size=size), self.assertNumQueries(14):
+                response = self.client.post(
+                    '/api/recipes/', data, format='json'
+                )
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.data['ingredients']), size)
+
+
+class RecipeSearchPaginationTest(APITestCase):
+    """Курсор не меняет сортировку результатов поиска."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='search@example.com', username='search',
+            first_name='search', last_name='search', password=None
+        )
+        cls.relevant, cls.recent = (
+            Recipe.objects.create(
+                author=author, name=name, text=text, cooking_time=10
+            ) for name, text in (
+                ('Борщ', 'Борщ со сметаной, борщ с пампушками.'),
+                ('Обед', 'Суп, потом борщ.'),
+            )
+        )
+
+    def test_search_with_cursor(self):
+        for query in ('', '&cursor='):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    f'/api/recipes/?search=борщ{query}'
+                )
+                self.assertEqual(
+                    [recipe['id'] for recipe in response.data['results']],
+                    [self.relevant.pk, self.recent.pk]
+                )
+
+
+def image_data(color):
+    buf = BytesIO()
+    Image.new('RGB', (32, 32), color).save(buf, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buf.getvalue()
+    ).decode()
+
+
+class RecipeImageFilesTest(APITestCase):
+    """Старые файлы картинки удаляются при замене и удалении рецепта."""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media = media
+        user = User.objects.create_user(
+            email='image@example.com', username='image',
+            first_name='image', last_name='image', password=None
+        )
+        self.client.force_authenticate(user)
+        self.data = {
+            'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+            'tags': [Tag.objects.create(
+                name='Тег', color='#000000', slug='image-tag'
+            ).pk],
+            'ingredients': [{'id': Ingredient.objects.create(
+                name='Мука', measurement_unit='г'
+            ).pk, 'amount': 10}],
+        }
+
+    def files(self, pk):
+        return image_files(Recipe.objects.get(pk=pk))
+
+    def assert_exist(self, names, exist):
+        for name in names:
+            self.assertEqual(
+                os.path.exists(os.path.join(self.media, name)), exist, name
+            )
+
+    def test_replace_and_delete(self):
+        pk = self.client.post('/api/recipes/', {
+            **self.data, 'image': image_data('red')
+        }, format='json').data['id']
+        process_pending(1)
+        old = self.files(pk)
+        self.assertEqual(len(old), 4)
+        self.assert_exist(old, True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/recipes/{pk}/', {
+                **self.data, 'image': image_data('blue')
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        new = self.files(pk)
+        self.assertEqual(len(new), 1)
+        self.assert_exist(old, False)
+        self.assert_exist(new, True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/recipes/{pk}/')
+        self.assert_exist(new, False)
+
+
+class ShoppingCartDownloadTest(APITestCase):
+    """Формат списка покупок выбирается по ?format= и Accept."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='cart@example.com', username='cart',
+            first_name='cart', last_name='cart', password=None
+        )
+        recipe = Recipe.objects.create(
+            author=cls.user, name='Рецепт', text='Описание', cooking_time=10
+        )
+        RecipeIngredient.objects.create(
+            recipe=recipe, amount=10, ingredient=Ingredient.objects.create(
+                name='Мука', measurement_unit='г'
+            )
+        )
+        Shoplist.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_formats(self):
+        url = '/api/recipes/download_shopping_cart/'
+        for query, accept, content_type in (
+            ('', 'application/json', 'application/pdf'),
+            ('', 'text/csv', 'text/csv'),
+            ('?format=txt', 'application/json', 'text/plain'),
+        ):
+            with self.subTest(query=query, accept=accept):
+                response = self.client.get(url + query, HTTP_ACCEPT=accept)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(
+                    response['Content-Type'].startswith(content_type)
+                )
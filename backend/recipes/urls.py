@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
+from .async_views import async_routes
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet
 
 app_name = 'recipes'
@@ -10,6 +12,10 @@ router.register(r'ingredients', IngredientViewSet, basename='ingredients')
 router.register(r'tags', TagViewSet, basename='tags')
 router.register(r'recipes', RecipeViewSet, basename='recipes')
 
+urls = router.urls
+if settings.ASYNC_VIEWS:
+    urls = async_routes(urls)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(urls)),
 ]
@@ -1,27 +1,85 @@
-from django.db.models import F, Sum
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import mixins, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.generics import get_object_or_404
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from utils.functions import data_aggregartion, pdf_making
-from utils.pagination import CustomPagination
+from utils.cache import VersionedCacheMixin
+from utils.conditional import ConditionalMixin
+from utils.export import (EXPORT_RENDERERS, ExportContentNegotiation,
+                          shopping_list_response)
+from utils.pagination import FeedPagination
+from .autocomplete import ingredient_index
 from .filters import IngredientFilter, RecipeFilter
 from .models import (
-    Favorite, Ingredient,
-    Recipe, RecipeIngredient,
-    Shoplist, Tag
+    DataVersion, Favorite, Ingredient,
+    Recipe, Shoplist,
+    ShoplistTotal, Tag
 )
 from .permissions import IsAuthorOrReadOnlyPermission
 from .serializers import (
     FavoriteSerializer, IngredientShowSerializer, RecipeCreateSerializer,
-    RecipeShowSerializer, ShopListSerializer, TagSerializer
+    RecipeIdsSerializer, RecipeShowSerializer, ShopListSerializer,
+    TagSerializer
 )
 
+ADDED = 'added'
+EXISTS = 'exists'
+REMOVED = 'removed'
+ABSENT = 'absent'
+NOT_FOUND = 'not_found'
+
+
+RECIPE_DATA_VERSIONS = (DataVersion.TAGS, DataVersion.INGREDIENTS)
+
+
+class ReferenceDataMixin(VersionedCacheMixin, ConditionalMixin):
+    """Справочные данные с валидаторами и кэшем по версии DataVersion."""
+
+    data_version = None
+
+    @classmethod
+    def validators_for(cls, version):
+        """Части ETag, время изменения и номер версии данных."""
+        if version is None:
+            return (cls.data_version, 0), None, 0
+        return (
+            (cls.data_version, version.version),
+            version.updated_at,
+            version.version
+        )
+
+    def get_validators(self):
+        parts, last_modified, self.version = self.validators_for(
+            DataVersion.objects.get_versions(
+                self.data_version
+            ).get(self.data_version)
+        )
+        return parts, last_modified
+
+    def cached_handler(self, handler):
+        def cached(request, *args, **kwargs):
+            return self.cached(
+                self.version, handler, request, *args, **kwargs
+            )
+        return cached
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            self.cached_handler(super().list), request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(
+            self.cached_handler(super().retrieve), request, *args, **kwargs
+        )
+
 
 class TagViewSet(
+    ReferenceDataMixin,
     mixins.RetrieveModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet
@@ -30,28 +88,168 @@ class TagViewSet(
     pagination_class = None
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
+    data_version = DataVersion.TAGS
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
-    pagination_class = CustomPagination
+    pagination_class = FeedPagination
+    cursor_ordering = ('-pub_date', 'id')
     permission_classes = (IsAuthorOrReadOnlyPermission,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return Recipe.objects.with_user_data(self.request.user)
+        return super().get_queryset()
+
+    @staticmethod
+    def validators_query(user, pk):
+        """Всё, от чего зависит рецепт в ответе, одним запросом."""
+        queryset = Recipe.objects.filter(pk=pk)
+        fields = (
+            'updated_at', 'image_full', 'author__email', 'author__username',
+            'author__first_name', 'author__last_name'
+        )
+        if user.is_authenticated:
+            queryset = queryset.annotate(
+                is_subscribed=Exists(
+                    user.follower.filter(following=OuterRef('author'))
+                ),
+                is_favorited=Exists(
+                    user.favorite.filter(recipe=OuterRef('pk'))
+                ),
+                is_in_shopping_cart=Exists(
+                    user.shoplist.filter(recipe=OuterRef('pk'))
+                ),
+            )
+            fields += ('is_subscribed', 'is_favorited', 'is_in_shopping_cart')
+        return queryset.values_list(*fields)
+
+    @staticmethod
+    def validators_for(user, pk, recipe, versions):
+        parts = (pk, user.pk, recipe) + tuple(
+            (name, version.version)
+            for name, version in sorted(versions.items())
+        )
+        if user.is_authenticated:
+            # Флаги пользователя не имеют даты изменения.
+            return parts, None
+        return parts, max(
+            [recipe[0]]
+            + [version.updated_at for version in versions.values()]
+        )
+
+    def get_validators(self):
+        if self.action != 'retrieve':
+            return None
+        user = self.request.user
+        pk = self.kwargs['pk']
+        try:
+            recipe = self.validators_query(user, pk).first()
+        except ValueError:
+            return None
+        if recipe is None:
+            return None
+        return self.validators_for(
+            user, pk, recipe,
+            DataVersion.objects.get_versions(*RECIPE_DATA_VERSIONS)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['image_variant'] = 'card' if self.action == 'list' else 'full'
+        return context
+
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update'):
             return RecipeCreateSerializer
         return RecipeShowSerializer
 
-    @action(detail=False, permission_classes=[permissions.IsAuthenticated])
+    @action(
+        detail=False,
+        permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=EXPORT_RENDERERS,
+        content_negotiation_class=ExportContentNegotiation
+    )
     def download_shopping_cart(self, request):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shoplist__user=self.request.user).values(
+        ingredients = ShoplistTotal.objects.filter(
+            user=self.request.user).values(
+                'amount',
                 ingredient_name=F('ingredient__name'),
                 measurement_unit=F('ingredient__measurement_unit')
-        ).annotate(amount=Sum('amount')).order_by('ingredient__name')
-        return pdf_making(ingredients)
+        ).order_by('ingredient__name')
+        return shopping_list_response(
+            ingredients.iterator(),
+            request.accepted_renderer.format
+        )
+
+    def recipe_id(self):
+        try:
+            return int(self.kwargs['pk'])
+        except ValueError:
+            raise NotFound
+
+    def change_recipes(self, model, recipe_ids, add):
+        """Добавляет или удаляет рецепты и возвращает итог по каждому id."""
+        with transaction.atomic():
+            manager = model.objects
+            changed = set(
+                (manager.add if add else manager.remove)(
+                    self.request.user, recipe_ids
+                )
+            )
+            rest = [pk for pk in recipe_ids if pk not in changed]
+            existing = set(Recipe.objects.filter(
+                pk__in=rest
+            ).values_list('pk', flat=True)) if rest else set()
+        return {
+            pk: (ADDED if add else REMOVED) if pk in changed
+            else (EXISTS if add else ABSENT) if pk in existing
+            else NOT_FOUND
+            for pk in recipe_ids
+        }
+
+    def add_one(self, model, serializer, error):
+        pk = self.recipe_id()
+        outcome = self.change_recipes(model, [pk], add=True)[pk]
+        if outcome == NOT_FOUND:
+            raise NotFound
+        if outcome == EXISTS:
+            return Response(
+                {'errors': error}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            serializer(model(user=self.request.user, recipe_id=pk)).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def remove_one(self, model, error):
+        pk = self.recipe_id()
+        outcome = self.change_recipes(model, [pk], add=False)[pk]
+        if outcome == NOT_FOUND:
+            raise NotFound
+        if outcome == ABSENT:
+            return Response(
+                {'errors': error}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def change_many(self, model):
+        serializer = RecipeIdsSerializer(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = self.change_recipes(
+            model,
+            serializer.validated_data['recipes'],
+            add=self.request.method == 'POST'
+        )
+        return Response([
+            {'id': pk, 'status': outcome} for pk, outcome in outcomes.items()
+        ])
 
     @action(
         detail=True,
@@ -59,7 +257,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def favorite(self, request, pk):
-        return data_aggregartion(FavoriteSerializer, pk=pk, request=request)
+        return self.add_one(
+            Favorite, FavoriteSerializer,
+            'Такой рецепт уже добавлен в избранное'
+        )
 
     @action(
         detail=True,
@@ -67,22 +268,39 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated]
     )
     def shopping_cart(self, request, pk):
-        return data_aggregartion(ShopListSerializer, pk=pk, request=request)
+        return self.add_one(
+            Shoplist, ShopListSerializer, 'Такой рецепт уже добавлен в корзину'
+        )
 
     @favorite.mapping.delete
     def delete_favorite(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
-        get_object_or_404(Favorite, user=request.user, recipe=recipe).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.remove_one(Favorite, 'Этого рецепта нет в избранном')
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
-        get_object_or_404(Shoplist, user=request.user, recipe=recipe).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.remove_one(Shoplist, 'Этого рецепта нет в корзине')
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        permission_classes=[IsAuthenticated]
+    )
+    def favorite_batch(self, request):
+        return self.change_many(Favorite)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        permission_classes=[IsAuthenticated]
+    )
+    def shopping_cart_batch(self, request):
+        return self.change_many(Shoplist)
 
 
 class IngredientViewSet(
+    ReferenceDataMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet
@@ -93,3 +311,18 @@ class IngredientViewSet(
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     permission_classes = (AllowAny,)
+    data_version = DataVersion.INGREDIENTS
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(
+            self.search_or_list, request, *args, **kwargs
+        )
+
+    def search_or_list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name, self.version))
+        return self.cached(
+            self.version, super(ReferenceDataMixin, self).list,
+            request, *args, **kwargs
+        )
@@ -18,13 +18,5 @@ class UserAdmin(BaseUserAdmin):
     )
     list_filter = ('email', 'username',)
 
-    @admin.display(description='Кол-во рецептов')
-    def recipes_count(self, obj):
-        return obj.recipes.count()
-
-    @admin.display(description='Кол-во подписчиков')
-    def followers_count(self, obj):
-        return obj.following.count()
-
 
 admin.site.unregister(Group)
@@ -0,0 +1,85 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """LRU токенов с TTL в памяти процесса и, по желанию, в общем кэше.
+
+    Записи сбрасываются сигналами при выходе, смене пароля и любом
+    сохранении пользователя. В других процессах запись живёт
+    не дольше AUTH_TOKEN_CACHE_TTL.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def shared_key(key):
+        return f'auth-token:{key}'
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    return entry[1]
+                del self._entries[key]
+        if settings.AUTH_TOKEN_SHARED_CACHE:
+            entry = cache.get(self.shared_key(key))
+            if entry is not None:
+                self._store(key, entry)
+                return entry
+        return None
+
+    def set(self, key, entry):
+        self._store(key, entry)
+        if settings.AUTH_TOKEN_SHARED_CACHE:
+            cache.set(
+                self.shared_key(key), entry, settings.AUTH_TOKEN_CACHE_TTL
+            )
+
+    def _store(self, key, entry):
+        with self._lock:
+            self._entries[key] = (
+                time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL, entry
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if settings.AUTH_TOKEN_SHARED_CACHE and keys:
+            cache.delete_many([self.shared_key(key) for key in keys])
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к БД для известных токенов."""
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            entry = super().authenticate_credentials(key)
+            token_cache.set(key, entry)
+        user, token = entry
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                'Пользователь неактивен или удалён.'
+            )
+        # Копия, чтобы изменения в одном запросе не попали в кэш.
+        return copy.copy(user), token
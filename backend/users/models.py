@@ -3,9 +3,10 @@ from django.db import models
 from django.db.models import CheckConstraint, UniqueConstraint
 
 from utils.constants import EMAIL_MAX_LENGTH, NAME_MAX_LENGTH
+from utils.models import CountersMixin
 
 
-class User(AbstractUser):
+class User(CountersMixin, AbstractUser):
     """Модель юзера"""
     username = models.CharField(
         'Логин',
@@ -33,6 +34,22 @@ class User(AbstractUser):
         null=False,
         blank=False
     )
+    recipes_count = models.PositiveIntegerField(
+        'Кол-во рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Кол-во подписчиков',
+        default=0,
+        editable=False
+    )
+    following_count = models.PositiveIntegerField(
+        'Кол-во подписок',
+        default=0,
+        editable=False
+    )
+    counter_fields = ('recipes_count', 'followers_count', 'following_count')
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
     USERNAME_FIELD = 'email'
 
@@ -72,6 +89,12 @@ class Follow(models.Model):
                 name='prevent_self_follow'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['following', 'user'],
+                name='follow_by_following'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} подписался на {self.following}'
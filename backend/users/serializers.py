@@ -3,6 +3,7 @@ from rest_framework.exceptions import ValidationError
 
 from .models import Follow, User
 from recipes.models import Recipe
+from utils.fields import ImageVariantField
 
 
 class NewUserSerializer(serializers.ModelSerializer):
@@ -23,6 +24,8 @@ class NewUserSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """Подписан ли текущий пользователь на этого"""
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (
             request.user.is_authenticated
@@ -32,6 +35,8 @@ class NewUserSerializer(serializers.ModelSerializer):
 
 class RecipeFollowShowSerializer(serializers.ModelSerializer):
     """Сериализатор для отображения рецепта в подписках"""
+    image = ImageVariantField(variant='preview')
+
     class Meta:
         model = Recipe
         fields = (
@@ -44,13 +49,17 @@ class RecipeFollowShowSerializer(serializers.ModelSerializer):
 
 class FollowShowSerializer(NewUserSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
         fields = NewUserSerializer.Meta.fields + ('recipes', 'recipes_count')
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'recipes_preview'):
+            return RecipeFollowShowSerializer(
+                obj.recipes_preview, many=True
+            ).data
         recipes = obj.recipes.all()
         recipes_limit = self.context.get(
             'request'
@@ -61,9 +70,6 @@ class FollowShowSerializer(NewUserSerializer):
             recipes = recipes[:int(recipes_limit)]
         return RecipeFollowShowSerializer(recipes, many=True).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class FollowSerializer(serializers.ModelSerializer):
 
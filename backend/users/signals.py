@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .models import Follow, User
+
+
+@receiver(post_save, sender=Follow)
+def follow_added(sender, instance, created, **kwargs):
+    if created:
+        User.shift_counters(instance.user_id, 1, 'following_count')
+        User.shift_counters(instance.following_id, 1, 'followers_count')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_removed(sender, instance, **kwargs):
+    User.shift_counters(instance.user_id, -1, 'following_count')
+    User.shift_counters(instance.following_id, -1, 'followers_count')
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, **kwargs):
+    # Пароль, активность и данные профиля берутся из кэша токенов.
+    token_cache.invalidate(*Token.objects.filter(
+        user=instance
+    ).values_list('key', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
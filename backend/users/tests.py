@@ -0,0 +1,47 @@
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe
+from .models import Follow, User
+
+AUTHORS = 6
+
+
+class SubscriptionsQueryCountTest(APITestCase):
+    """Подписки отдаются постоянным числом запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(
+            email='reader@example.com', username='reader',
+            first_name='reader', last_name='reader', password=None
+        )
+        for number in range(AUTHORS):
+            author = User.objects.create_user(
+                email=f'author{number}@example.com',
+                username=f'author{number}',
+                first_name='author', last_name='author', password=None
+            )
+            for recipe in range(number + 1):
+                Recipe.objects.create(
+                    author=author, name=f'Рецепт {recipe}', text='Описание',
+                    cooking_time=10
+                )
+            Follow.objects.create(user=cls.reader, following=author)
+
+    def setUp(self):
+        self.client.force_authenticate(self.reader)
+
+    def test_subscriptions(self):
+        for limit, recipes_limit in ((1, 1), (AUTHORS, 3)):
+            with self.subTest(limit=limit), self.assertNumQueries(3):
+                response = self.client.get(
+                    '/api/users/subscriptions/'
+                    f'?limit={limit}&recipes_limit={recipes_limit}'
+                )
+            results = response.data['results']
+            self.assertEqual(len(results), limit)
+            for author in results:
+                self.assertEqual(
+                    len(author['recipes']),
+                    min(recipes_limit, author['recipes_count'])
+                )
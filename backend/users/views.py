@@ -1,10 +1,13 @@
+from django.db import transaction
+from django.db.models import Prefetch, Value
 from rest_framework import status
 from rest_framework.generics import ListAPIView, get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from utils.pagination import CustomPagination
+from recipes.models import Recipe
+from utils.pagination import FeedPagination
 from .models import Follow, User
 from .serializers import FollowSerializer, FollowShowSerializer
 
@@ -18,7 +21,8 @@ class FollowView(APIView):
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, id):
@@ -32,9 +36,25 @@ class FollowView(APIView):
 
 class FollowListView(ListAPIView):
     serializer_class = FollowShowSerializer
-    pagination_class = CustomPagination
+    pagination_class = FeedPagination
+    cursor_ordering = ('-username', 'id')
     permission_classes = (IsAuthenticated,)
 
+    def get_recipes_limit(self):
+        try:
+            limit = int(self.request.query_params['recipes_limit'])
+        except (KeyError, ValueError):
+            return None
+        return limit if limit >= 0 else None
+
     def get_queryset(self):
         user = self.request.user
-        return User.objects.filter(following__user=user)
+        recipes = Recipe.objects.order_by('-pub_date', 'id')
+        recipes_limit = self.get_recipes_limit()
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
+        return User.objects.filter(following__user=user).annotate(
+            is_subscribed=Value(True)
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='recipes_preview')
+        )
@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared(alias='default'):
+    """Общий ли кэш для всех процессов, а не память одного процесса."""
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_BACKENDS
+
+
+def response_cache_key(view_name, action, pk, version, media_type):
+    return ':'.join(map(str, (
+        'response', view_name, action, pk, version, media_type
+    )))
+
+
+class VersionedCacheMixin:
+    """Готовые байты ответа в кэше под ключом с версией данных.
+
+    При изменении данных версия растёт, и старые ключи просто
+    перестают запрашиваться, поэтому все процессы видят одно и то же.
+    """
+
+    cache_alias = 'default'
+    cache_format = 'json'
+
+    def get_cache_key(self, request, version):
+        return response_cache_key(
+            type(self).__name__, self.action,
+            self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, ''),
+            version, request.accepted_media_type
+        )
+
+    def cached(self, version, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != self.cache_format:
+            return handler(request, *args, **kwargs)
+        cache = caches[self.cache_alias]
+        key = self.get_cache_key(request, version)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        response = self.finalize_response(
+            request, handler(request, *args, **kwargs), *args, **kwargs
+        )
+        if response.status_code == 200:
+            response.render()
+            cache.set(
+                key,
+                (response.content, response['Content-Type']),
+                settings.RESPONSE_CACHE_TIMEOUT
+            )
+        return response
@@ -0,0 +1,48 @@
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    return quote_etag(md5(repr(parts).encode()).hexdigest())
+
+
+def timestamp_of(last_modified):
+    return last_modified and int(last_modified.timestamp())
+
+
+def set_validators(response, etag, timestamp):
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        response['ETag'] = etag
+        if timestamp:
+            response['Last-Modified'] = http_date(timestamp)
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalMixin:
+    """ETag и Last-Modified без сериализации данных.
+
+    Вьюсет возвращает из get_validators() части ETag и время изменения,
+    посчитанные дешёвым запросом. Если у клиента актуальная версия,
+    он получает 304, а сериализация не выполняется.
+    """
+
+    def get_validators(self):
+        """Пара (части ETag, время изменения) или None."""
+        return None
+
+    def conditional(self, handler, request, *args, **kwargs):
+        validators = self.get_validators()
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        parts, last_modified = validators
+        etag = make_etag(*parts)
+        timestamp = timestamp_of(last_modified)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        return set_validators(response, etag, timestamp)
@@ -2,3 +2,4 @@ RECIPE_APPM_MAX_LENGTH = 200
 NAME_MAX_LENGTH = 150
 EMAIL_MAX_LENGTH = 254
 MAX_VALIDATOR = 32767
+RECIPE_BATCH_MAX_SIZE = 100
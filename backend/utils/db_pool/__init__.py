@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+
+pools = {}
+pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений с БД на процесс.
+
+    Соединения, простоявшие дольше check_idle секунд, перед выдачей
+    проверяются функцией ping и при ошибке пересоздаются. params —
+    параметры подключения, для которых открыты соединения пула.
+    """
+
+    def __init__(self, params, size, timeout, check_idle, ping):
+        self.params = params
+        self.closed = False
+        self.size = size
+        self.timeout = timeout
+        self.check_idle = check_idle
+        self.ping = ping
+        self.idle = deque()
+        self.opened = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.failed_checks = 0
+        self.checkout_time = 0.0
+        self.max_checkout_time = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self, connect):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self.condition:
+            waited = False
+            while not self.idle and self.opened >= self.size:
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.condition.wait(remaining):
+                    self.timeouts += 1
+                    raise OperationalError(
+                        f'Нет свободных соединений за {self.timeout} с'
+                    )
+            connection, released_at = (
+                self.idle.pop() if self.idle else (None, None)
+            )
+            if connection is None:
+                self.opened += 1
+            self.in_use += 1
+        try:
+            if connection is not None and (
+                time.monotonic() - released_at > self.check_idle
+                and not self.is_alive(connection)
+            ):
+                self.failed_checks += 1
+                connection = None
+            if connection is None:
+                connection = connect()
+        except Exception:
+            with self.condition:
+                self.opened -= 1
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        elapsed = time.monotonic() - start
+        with self.condition:
+            self.checkouts += 1
+            self.checkout_time += elapsed
+            self.max_checkout_time = max(self.max_checkout_time, elapsed)
+        return connection
+
+    def is_alive(self, connection):
+        try:
+            self.ping(connection)
+        except Exception:
+            self.discard(connection)
+            return False
+        return True
+
+    @staticmethod
+    def discard(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def release(self, connection, reusable=True):
+        with self.condition:
+            self.in_use -= 1
+            reusable = reusable and not self.closed
+            if reusable:
+                self.idle.append((connection, time.monotonic()))
+            else:
+                self.opened -= 1
+            self.condition.notify()
+        if not reusable:
+            self.discard(connection)
+
+    def close(self):
+        """Закрывает свободные соединения, выданные закроются при возврате."""
+        with self.condition:
+            self.closed = True
+            idle, self.idle = self.idle, deque()
+            self.opened -= len(idle)
+        for connection, released_at in idle:
+            self.discard(connection)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'size': self.size,
+                'opened': self.opened,
+                'in_use': self.in_use,
+                'idle': len(self.idle),
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'failed_checks': self.failed_checks,
+                'avg_checkout_ms': round(
+                    self.checkout_time * 1000 / self.checkouts, 3
+                ) if self.checkouts else 0,
+                'max_checkout_ms': round(self.max_checkout_time * 1000, 3),
+            }
+
+
+def get_pool(alias, params, **options):
+    """Пул соединений alias для параметров подключения params.
+
+    Если параметры изменились (например, NAME при создании тестовой
+    базы), старый пул закрывается и создаётся новый.
+    """
+    with pools_lock:
+        pool = pools.get(alias)
+        if pool is None or pool.params != params:
+            if pool is not None:
+                pool.close()
+            pool = pools[alias] = ConnectionPool(params, **options)
+        return pool
+
+
+def pool_stats():
+    with pools_lock:
+        return {alias: pool.stats() for alias, pool in pools.items()}
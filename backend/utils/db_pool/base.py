@@ -0,0 +1,63 @@
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from . import get_pool
+
+POOL_KEY = ('NAME', 'HOST', 'PORT', 'USER')
+
+
+def ping(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с пулом соединений вместо нового соединения на запрос.
+
+    Django закрывает соединение в конце запроса, а этот бэкенд
+    возвращает его в пул процесса, из которого оно было взято.
+    Настройки пула задаются в POOL.
+    """
+
+    def get_pool(self):
+        options = self.settings_dict.get('POOL', {})
+        return get_pool(
+            self.alias,
+            tuple(self.settings_dict[key] for key in POOL_KEY),
+            size=options.get('SIZE', 4),
+            timeout=options.get('TIMEOUT', 10),
+            check_idle=options.get('CHECK_IDLE', 30),
+            ping=ping
+        )
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool()
+        connection = self.pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            )
+        )
+        isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level'
+        )
+        self.isolation_level = (
+            IsolationLevel.READ_COMMITTED if isolation_level is None
+            else IsolationLevel(isolation_level)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        reusable = not connection.closed
+        if reusable:
+            try:
+                if connection.get_transaction_status() != (
+                    TRANSACTION_STATUS_IDLE
+                ):
+                    connection.rollback()
+            except Exception:
+                reusable = False
+        self.pool.release(connection, reusable)
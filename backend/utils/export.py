@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+FONT_NAME = 'FreeSans'
+FONT_PATH = settings.BASE_DIR / 'utils' / 'FreeSans.ttf'
+FONT_SIZE = 14
+LINE_HEIGHT = FONT_SIZE * 1.4
+TITLE = 'СПИСОК ПОКУПОК'
+FILENAME = 'recipes'
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    """Шрифт регистрируется один раз на процесс."""
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+    return FONT_NAME
+
+
+def shopping_list_lines(ingredients):
+    for ingredient in ingredients:
+        yield (f'{ingredient["ingredient_name"]}, '
+               f'{ingredient["measurement_unit"]}, '
+               f'{ingredient["amount"]}')
+
+
+def pdf_response(ingredients):
+    """PDF с переносом строк на новые страницы."""
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4, bottomup=0)
+    c.setTitle(TITLE)
+    font = register_font()
+    bottom = A4[1] - inch
+    textob = None
+    for line in shopping_list_lines(ingredients):
+        if textob is not None and textob.getY() + LINE_HEIGHT > bottom:
+            c.drawText(textob)
+            c.showPage()
+            textob = None
+        if textob is None:
+            textob = c.beginText()
+            textob.setTextOrigin(inch, inch)
+            textob.setFont(font, FONT_SIZE, LINE_HEIGHT)
+        textob.textLine(line)
+    if textob is not None:
+        c.drawText(textob)
+    c.showPage()
+    c.save()
+    buf.seek(0)
+    return FileResponse(buf, as_attachment=True, filename=f'{FILENAME}.pdf')
+
+
+def txt_response(ingredients):
+    lines = (f'{line}\n' for line in shopping_list_lines(ingredients))
+    return attachment(
+        StreamingHttpResponse(lines, content_type=content_type(TxtRenderer)),
+        'txt'
+    )
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: отдаёт строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_response(ingredients):
+    writer = csv.writer(Echo())
+    rows = (
+        writer.writerow((
+            ingredient['ingredient_name'],
+            ingredient['measurement_unit'],
+            ingredient['amount']
+        )) for ingredient in ingredients
+    )
+    return attachment(
+        StreamingHttpResponse(rows, content_type=content_type(CsvRenderer)),
+        'csv'
+    )
+
+
+def content_type(renderer):
+    return f'{renderer.media_type}; charset={renderer.charset}'
+
+
+def attachment(response, extension):
+    response['Content-Disposition'] = (
+        f'attachment; filename="{FILENAME}.{extension}"'
+    )
+    return response
+
+
+class ExportRenderer(BaseRenderer):
+    """Рендерер для выбора формата выгрузки через ?format=.
+
+    Сами выгрузки отдаются готовыми ответами, через рендерер проходят
+    только ошибки.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+class PdfRenderer(ExportRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+
+class TxtRenderer(ExportRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class CsvRenderer(ExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+EXPORT_RENDERERS = (PdfRenderer, TxtRenderer, CsvRenderer)
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """Формат из ?format= или Accept, а при несовпадении Accept — PDF.
+
+    Клиенты, которые шлют Accept: application/json, получают файл,
+    а не 406.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except NotAcceptable:
+            format = format_suffix or request.query_params.get(
+                self.settings.URL_FORMAT_OVERRIDE
+            )
+            if format:
+                renderers = self.filter_renderers(renderers, format)
+            return renderers[0], renderers[0].media_type
+
+
+EXPORTS = {
+    'pdf': pdf_response,
+    'txt': txt_response,
+    'csv': csv_response,
+}
+
+
+def shopping_list_response(ingredients, export_format):
+    return EXPORTS[export_format](ingredients)
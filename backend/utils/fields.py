@@ -0,0 +1,137 @@
+import base64
+import binascii
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile,
+                                            UploadedFile)
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image, ImageFile
+from rest_framework import serializers
+
+
+class ImageVariantField(serializers.Field):
+    """URL уменьшенной копии картинки, а пока её нет — оригинала.
+
+    Копия выбирается параметром variant или ключом image_variant
+    в контексте сериализатора.
+    """
+
+    def __init__(self, variant=None, field='image', **kwargs):
+        self.variant = variant
+        self.field = field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        variant = self.variant or self.context.get('image_variant')
+        image = None
+        if variant:
+            image = getattr(instance, f'{self.field}_{variant}', None)
+        if not image:
+            image = getattr(instance, self.field)
+        if not image:
+            return None
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(image.url)
+        return image.url
+
+
+class TemporaryImageFile(TemporaryUploadedFile):
+    """Временный файл, который закрывается и при сборке мусора.
+
+    Хранилище перемещает его при сохранении, а close() не падает,
+    если файла уже нет.
+    """
+
+    def __del__(self):
+        self.close()
+
+
+class BoundedImageField(Base64ImageField):
+    """Картинка в base64 или файлом multipart с ограничением памяти.
+
+    Base64 декодируется частями во временный файл, размер и разрешение
+    проверяются до полного декодирования.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    HEADER_SIZE = 256 * 1024
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        if isinstance(data, UploadedFile):
+            self.check_size(data.size)
+            self.check_header(data)
+            return serializers.ImageField.to_internal_value(self, data)
+        if not isinstance(data, str):
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        return serializers.ImageField.to_internal_value(
+            self, self.decode(data)
+        )
+
+    def check_size(self, size):
+        if size > settings.RECIPE_IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(
+                'Картинка больше '
+                f'{settings.RECIPE_IMAGE_MAX_SIZE // (1024 * 1024)} МБ.'
+            )
+
+    def check_dimensions(self, image):
+        width, height = image.size
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                f'Слишком большое разрешение: {width}x{height}.'
+            )
+
+    def check_header(self, file):
+        try:
+            self.check_dimensions(Image.open(file))
+        except (OSError, Image.DecompressionBombError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        finally:
+            file.seek(0)
+
+    def decode(self, data):
+        if ';base64,' in data:
+            data = data.split(';base64,', 1)[1]
+        size = len(data) * 3 // 4
+        self.check_size(size)
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            file = TemporaryImageFile('image', None, size, None)
+        else:
+            file = InMemoryUploadedFile(
+                BytesIO(), None, 'image', None, size, None
+            )
+        parser = ImageFile.Parser()
+        chunk_size = self.CHUNK_SIZE // 4 * 4
+        try:
+            for start in range(0, len(data), chunk_size):
+                chunk = base64.b64decode(data[start:start + chunk_size])
+                file.write(chunk)
+                if parser.image is None and start < self.HEADER_SIZE:
+                    parser.feed(chunk)
+                    if parser.image is not None:
+                        self.check_dimensions(parser.image)
+        except (binascii.Error, ValueError, OSError):
+            file.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        except serializers.ValidationError:
+            file.close()
+            raise
+        if parser.image is None:
+            file.close()
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        extension = parser.image.format.lower().replace('jpeg', 'jpg')
+        if extension not in self.ALLOWED_TYPES:
+            file.close()
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        file.name = f'{uuid.uuid4()}.{extension}'
+        file.size = file.tell()
+        file.seek(0)
+        return file
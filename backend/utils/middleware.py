@@ -0,0 +1,69 @@
+import logging
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('foodgram.sql')
+
+
+class QueryCollector:
+    """Обёртка для execute_wrapper: считает запросы и время в БД."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[sql] += 1
+
+    def duplicates(self, threshold):
+        return [
+            (sql, count) for sql, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+class QueryCountMiddleware:
+    """Статистика SQL-запросов для каждого запроса к API.
+
+    Добавляет заголовки X-DB-Queries и X-DB-Time, пишет строку в лог
+    и предупреждает о повторяющихся одинаковых запросах (N+1).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = settings.SQL_DUPLICATE_THRESHOLD
+
+    def __call__(self, request):
+        collector = QueryCollector()
+        with connection.execute_wrapper(collector):
+            response = self.get_response(request)
+        db_time = round(collector.duration * 1000, 2)
+        response['X-DB-Queries'] = collector.count
+        response['X-DB-Time'] = db_time
+        view_name = getattr(request.resolver_match, 'view_name', None)
+        action = getattr(request, 'view_action', None)
+        logger.info(
+            'view=%s action=%s method=%s status=%s queries=%d db_ms=%s',
+            view_name, action, request.method, response.status_code,
+            collector.count, db_time
+        )
+        for sql, count in collector.duplicates(self.threshold):
+            logger.warning(
+                'view=%s action=%s repeated_query=%d sql=%s',
+                view_name, action, count, sql[:300]
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        actions = getattr(view_func, 'actions', None) or {}
+        request.view_action = actions.get(request.method.lower())
@@ -0,0 +1,30 @@
+from django.db.models import F
+
+
+class CountersMixin:
+    """Модель со счётчиками, которые меняются только через F()."""
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        # Полное сохранение загруженного объекта затёрло бы счётчики
+        # значениями на момент загрузки.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def shift_counters(cls, pk, delta, *fields):
+        cls.objects.filter(pk=pk).update(
+            **{field: F(field) + delta for field in fields}
+        )
+
+    @classmethod
+    def shift_many_counters(cls, pks, delta, *fields):
+        cls.objects.filter(pk__in=pks).update(
+            **{field: F(field) + delta for field in fields}
+        )
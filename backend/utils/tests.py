@@ -0,0 +1,39 @@
+from django.test import SimpleTestCase
+
+from utils.db_pool import pools
+from utils.db_pool.base import DatabaseWrapper
+
+ALIAS = 'pool-test'
+
+
+class Connection:
+    closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    """Пул привязан к параметрам подключения, а не только к alias."""
+
+    def setUp(self):
+        self.addCleanup(pools.pop, ALIAS, None)
+
+    def get_pool(self, name):
+        return DatabaseWrapper({
+            'NAME': name, 'HOST': 'db', 'PORT': '5432', 'USER': 'django',
+            'OPTIONS': {}, 'POOL': {'SIZE': 1, 'TIMEOUT': 0},
+        }, ALIAS).get_pool()
+
+    def test_name_change_opens_fresh_connection(self):
+        pool = self.get_pool('foodgram')
+        connection = pool.acquire(Connection)
+        pool.release(connection)
+        same = self.get_pool('foodgram')
+        self.assertIs(same.acquire(Connection), connection)
+        same.release(connection)
+
+        fresh = self.get_pool('test_foodgram').acquire(Connection)
+        self.assertIsNot(fresh, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pools[ALIAS].stats()['opened'], 1)
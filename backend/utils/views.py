@@ -0,0 +1,16 @@
+import os
+
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from utils.db_pool import pool_stats
+
+
+class DatabasePoolView(APIView):
+    """Статистика пулов соединений с БД текущего процесса."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({'pid': os.getpid(), 'pools': pool_stats()})